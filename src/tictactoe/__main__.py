@@ -1,34 +1,92 @@
 from __future__ import annotations
 
 import argparse
+from pathlib import Path
 
-from tictactoe.ui.cli import make_setup, play
+from tictactoe.core.game import default_k, default_radius
+from tictactoe.core.rollout import ROLLOUTS
+from tictactoe.stats import JsonLinesSink
+from tictactoe.ui.cli import BotOptions, check_q_model, make_setup, play
 from tictactoe.ui.tk import run_tk
 
+PLAYERS = ["human", "mcts", "q", "solver"]
+MAX_SIZE = 15
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(prog="tictactoe")
     parser.add_argument("--ui", choices=["cli", "tk"], default="cli")
     parser.add_argument("--size", type=int, default=3)
     parser.add_argument("--k", type=int, default=0)
-    parser.add_argument("--x", choices=["human", "mcts", "q"], default="human")
-    parser.add_argument("--o", choices=["human", "mcts", "q"], default="mcts")
+    parser.add_argument("--radius", type=int, default=None)
+    parser.add_argument("--x", choices=PLAYERS, default="human")
+    parser.add_argument("--o", choices=PLAYERS, default="mcts")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=None)
+    parser.add_argument("--time", type=float, default=None, dest="time_budget")
+    parser.add_argument("--depth", type=int, default=None)
+    parser.add_argument("--q-model", type=Path, default=None)
+    parser.add_argument("--book", action="store_true")
+    parser.add_argument("--book-path", type=Path, default=None)
+    parser.add_argument("--stats", default=None, metavar="PATH")
+    parser.add_argument("--ponder", action="store_true")
+    parser.add_argument("--rollout", choices=list(ROLLOUTS), default="random")
+    parser.add_argument("--rave", action="store_true")
     args = parser.parse_args()
-    win_k = args.size if args.k == 0 else args.k
+    if not 3 <= args.size <= MAX_SIZE:
+        raise SystemExit(f"Error: --size must be between 3 and {MAX_SIZE}")
+    win_k = default_k(args.size) if args.k == 0 else args.k
 
     if win_k < 3:
         raise SystemExit("Error: --k must be >= 3")
     if win_k > args.size:
         raise SystemExit("Error: --k must be <= --size")
 
-    win_k = None if args.k == 0 else args.k
+    if args.k == 0 and win_k == args.size:
+        win_k = None
+    # --radius 0 turns the large-board mode off.
+    radius = default_radius(args.size) if args.radius is None else args.radius or None
+    options = BotOptions(
+        workers=args.workers,
+        iterations=args.iterations,
+        time_budget=args.time_budget,
+        depth=args.depth,
+        q_model=args.q_model,
+        book=args.book or args.book_path is not None,
+        book_path=args.book_path,
+        ponder=args.ponder,
+        rollout=args.rollout,
+        rave=args.rave,
+    )
+    if args.book_path is not None and not args.book_path.exists():
+        raise SystemExit(f"Error: no opening book at {args.book_path}")
+    bots = [args.o] if args.ui == "tk" else [args.x, args.o]
+    if "q" in bots:
+        check_q_model(options, args.size, win_k or args.size)
+    sink = JsonLinesSink(args.stats) if args.stats else None
+    options.stats_hook = sink
 
-    if args.ui == "tk":
-        run_tk(size=args.size, win_k=win_k, bot=args.o)
-        return
+    try:
+        if args.ui == "tk":
+            run_tk(size=args.size, win_k=win_k, bot=args.o, options=options, radius=radius)
+            return
 
-    setup = make_setup(size=args.size, win_k=win_k, x_kind=args.x, o_kind=args.o)
-    play(setup)
+        setup = make_setup(
+            size=args.size,
+            win_k=win_k,
+            x_kind=args.x,
+            o_kind=args.o,
+            options=options,
+            radius=radius,
+        )
+        try:
+            play(setup)
+        finally:
+            setup.p_x.close()
+            setup.p_o.close()
+    finally:
+        if sink is not None:
+            sink.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import argparse
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from tictactoe.core.game import default_k, default_radius, new_game
+from tictactoe.core.rollout import ROLLOUTS
+from tictactoe.core.types import Mark
+from tictactoe.ui.cli import BotOptions, check_q_model, make_bot, with_book
+
+BOTS = ["mcts", "q", "solver"]
+
+
+@dataclass
+class MatchSpec:
+    a: str
+    b: str
+    size: int = 3
+    win_k: int = 3
+    a_options: BotOptions = field(default_factory=BotOptions)
+    b_options: BotOptions = field(default_factory=BotOptions)
+    seed: int = 0
+    radius: Optional[int] = None
+
+
+@dataclass
+class GameResult:
+    game: int
+    a_is_x: bool
+    score: float
+    a_times: List[float]
+    b_times: List[float]
+
+
+def game_seeds(seed: int, game: int) -> Tuple[int, int]:
+    base = (seed * 1_000_003 + game) * 2
+    return base, base + 1
+
+
+def play_game(spec: MatchSpec, game: int) -> GameResult:
+    # Even games: A plays X. Score is from A's point of view.
+    a_is_x = game % 2 == 0
+    a_mark = Mark.X if a_is_x else Mark.O
+    b_mark = Mark.O if a_is_x else Mark.X
+    seed_a, seed_b = game_seeds(spec.seed, game)
+    a = make_bot(spec.a, a_mark, spec.a_options, spec.size, spec.win_k, seed_a)
+    b = make_bot(spec.b, b_mark, spec.b_options, spec.size, spec.win_k, seed_b)
+    a = with_book(a, spec.a_options, spec.size, spec.win_k)
+    b = with_book(b, spec.b_options, spec.size, spec.win_k)
+    times = {a_mark: [], b_mark: []}
+    players = {a_mark: a, b_mark: b}
+    state = new_game(spec.size, spec.win_k, spec.radius)
+    clock = time.perf_counter
+    try:
+        while not state.is_terminal():
+            start = clock()
+            move = players[state.to_move].choose_move(state)
+            times[state.to_move].append(clock() - start)
+            state = state.apply(move)
+    finally:
+        a.close()
+        b.close()
+    winner = state.winner()
+    score = 0.5 if winner is None else (1.0 if winner == a_mark else 0.0)
+    return GameResult(game, a_is_x, score, times[a_mark], times[b_mark])
+
+
+def _play_chunk(spec: MatchSpec, games: range) -> List[GameResult]:
+    return [play_game(spec, g) for g in games]
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def elo_from_score(score: float) -> float:
+    if score <= 0.0:
+        return -math.inf
+    if score >= 1.0:
+        return math.inf
+    return 400.0 * math.log10(score / (1.0 - score))
+
+
+@dataclass
+class ArenaReport:
+    results: List[GameResult]
+    elapsed: float
+
+    @property
+    def games(self) -> int:
+        return len(self.results)
+
+    def count(self, score: float) -> int:
+        return sum(1 for r in self.results if r.score == score)
+
+    def score(self) -> float:
+        return sum(r.score for r in self.results) / max(1, self.games)
+
+    def elo(self) -> Tuple[float, float, float]:
+        # Elo difference of A over B with a 95% interval from the normal
+        # approximation of the mean game score.
+        n = self.games
+        mean = self.score()
+        var = sum((r.score - mean) ** 2 for r in self.results) / max(1, n - 1)
+        margin = 1.96 * math.sqrt(var / max(1, n))
+        lo = elo_from_score(mean - margin)
+        hi = elo_from_score(mean + margin)
+        return elo_from_score(mean), lo, hi
+
+    def latencies(self, side: str) -> List[float]:
+        out: List[float] = []
+        for r in self.results:
+            out.extend(r.a_times if side == "a" else r.b_times)
+        return out
+
+    def games_per_sec(self) -> float:
+        return self.games / self.elapsed if self.elapsed > 0 else 0.0
+
+    def lines(self, spec: MatchSpec) -> List[str]:
+        wins, draws, losses = self.count(1.0), self.count(0.5), self.count(0.0)
+        elo, lo, hi = self.elo()
+        out = [
+            f"{spec.a} vs {spec.b} on {spec.size}x{spec.size}, k={spec.win_k}: {self.games} games",
+            f"W/D/L for {spec.a}: {wins}/{draws}/{losses} (score {self.score():.3f})",
+            f"Elo {spec.a} - {spec.b}: {elo:+.0f} [{lo:+.0f}, {hi:+.0f}]",
+        ]
+        for side, kind in (("a", spec.a), ("b", spec.b)):
+            times = self.latencies(side)
+            mean = sum(times) / len(times) if times else 0.0
+            out.append(
+                f"{kind} ({side}) latency: mean {mean * 1e3:.2f} ms, "
+                f"p95 {percentile(times, 0.95) * 1e3:.2f} ms"
+            )
+        out.append(f"{self.games_per_sec():.1f} games/s")
+        return out
+
+
+def run_arena(spec: MatchSpec, games: int, workers: int = 1) -> ArenaReport:
+    start = time.perf_counter()
+    if workers <= 1:
+        results = _play_chunk(spec, range(games))
+    else:
+        # A few chunks per worker keeps the pool busy without paying the
+        # pickling cost of one task per game.
+        step = max(1, games // (workers * 4))
+        chunks = [range(i, min(i + step, games)) for i in range(0, games, step)]
+        results = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(_play_chunk, [spec] * len(chunks), chunks):
+                results.extend(part)
+    return ArenaReport(results, time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="tictactoe.arena")
+    parser.add_argument("--a", choices=BOTS, default="mcts")
+    parser.add_argument("--b", choices=BOTS, default="q")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--k", type=int, default=0)
+    parser.add_argument("--radius", type=int, default=None)
+    parser.add_argument("--iterations", type=int, default=None)
+    parser.add_argument("--a-iterations", type=int, default=None)
+    parser.add_argument("--b-iterations", type=int, default=None)
+    parser.add_argument("--time", type=float, default=None, dest="time_budget")
+    parser.add_argument("--a-time", type=float, default=None)
+    parser.add_argument("--b-time", type=float, default=None)
+    parser.add_argument("--rollout", choices=list(ROLLOUTS), default="random")
+    parser.add_argument("--a-rollout", choices=list(ROLLOUTS), default=None)
+    parser.add_argument("--b-rollout", choices=list(ROLLOUTS), default=None)
+    parser.add_argument("--rave", action="store_true")
+    parser.add_argument("--a-rave", action="store_true")
+    parser.add_argument("--b-rave", action="store_true")
+    parser.add_argument("--depth", type=int, default=None)
+    parser.add_argument("--q-model", type=Path, default=None)
+    parser.add_argument("--book", action="store_true")
+    args = parser.parse_args()
+
+    win_k = default_k(args.size) if args.k == 0 else args.k
+    if win_k < 3 or win_k > args.size:
+        raise SystemExit("Error: --k must be between 3 and --size")
+    radius = default_radius(args.size) if args.radius is None else args.radius or None
+
+    base = BotOptions(
+        iterations=args.iterations,
+        time_budget=args.time_budget,
+        depth=args.depth,
+        q_model=args.q_model,
+        book=args.book,
+        rollout=args.rollout,
+        rave=args.rave,
+    )
+    a_options = replace(
+        base,
+        iterations=args.a_iterations or base.iterations,
+        time_budget=args.a_time or base.time_budget,
+        rollout=args.a_rollout or base.rollout,
+        rave=args.a_rave or base.rave,
+    )
+    b_options = replace(
+        base,
+        iterations=args.b_iterations or base.iterations,
+        time_budget=args.b_time or base.time_budget,
+        rollout=args.b_rollout or base.rollout,
+        rave=args.b_rave or base.rave,
+    )
+    for kind, options in ((args.a, a_options), (args.b, b_options)):
+        if kind == "q":
+            check_q_model(options, args.size, win_k)
+    spec = MatchSpec(args.a, args.b, args.size, win_k, a_options, b_options, args.seed, radius)
+    report = run_arena(spec, args.games, args.workers)
+    for line in report.lines(spec):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from tictactoe.core.board import Board
+from tictactoe.core.game import GameState, default_radius, new_game
+from tictactoe.core.playout import Playout
+from tictactoe.core.rollout import ROLLOUTS, make_rollout
+from tictactoe.core.types import Mark, Move
+from tictactoe.players.mcts import MCTSBot
+from tictactoe.players.solver import DECISIVE, SolverBot
+from tictactoe.training.serialize import load_q_table, save_q_table
+from tictactoe.training.train_q import QParams, QTrainer
+
+DEFAULT_BASELINE = Path("data/bench_baseline.json")
+
+
+@dataclass
+class Result:
+    name: str
+    value: float
+    unit: str
+    higher_is_better: bool = True
+
+
+def _best_time(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _rate(name: str, fn: Callable[[], object], n: int, repeat: int = 5) -> Result:
+    return Result(name, n / _best_time(fn, repeat), "ops/s")
+
+
+def _latency(name: str, fn: Callable[[], object], repeat: int = 3) -> Result:
+    return Result(name, _best_time(fn, repeat) * 1e3, "ms", higher_is_better=False)
+
+
+def _midgame_states(size: int, win_k: int, n: int, seed: int = 0) -> List[GameState]:
+    rng = random.Random(seed)
+    states = []
+    while len(states) < n:
+        s = new_game(size, win_k)
+        for _ in range(rng.randrange(size * size // 2 + 1)):
+            if s.is_terminal():
+                break
+            s = s.apply(rng.choice(s.board.available_moves()))
+        states.append(s)
+    return states
+
+
+def bench_board(size: int, win_k: int) -> List[Result]:
+    states = _midgame_states(size, win_k, 200)
+    boards: List[Board] = [s.board for s in states]
+    moves = [s.board.available_moves() for s in states]
+    reps = 50
+
+    def winner() -> None:
+        for _ in range(reps):
+            for b in boards:
+                b.winner(win_k)
+
+    def available() -> None:
+        for _ in range(reps):
+            for b in boards:
+                b.available_moves()
+
+    def apply() -> None:
+        for _ in range(reps):
+            for s, ms in zip(states, moves):
+                if ms:
+                    s.apply(ms[0])
+
+    tag = f"{size}x{size}"
+    n = reps * len(boards)
+    return [
+        _rate(f"board_winner_{tag}", winner, n),
+        _rate(f"available_moves_{tag}", available, n),
+        _rate(f"state_apply_{tag}", apply, n),
+    ]
+
+
+def bench_rollouts(size: int, win_k: int, policy: str = "random") -> List[Result]:
+    pl = Playout(size, win_k)
+    pl.load(new_game(size, win_k))
+    rng = random.Random(0)
+    rollout = make_rollout(policy).rollout
+    n = 2000
+
+    def run() -> None:
+        for _ in range(n):
+            rollout(pl, rng)
+
+    tag = "" if policy == "random" else f"_{policy}"
+    return [_rate(f"rollouts{tag}_{size}x{size}", run, n)]
+
+
+@lru_cache(maxsize=None)
+def _forced_wins(
+    size: int, win_k: int, n: int, depth: int, seed: int = 0
+) -> List[Tuple[GameState, Set[Move]]]:
+    # Positions where the solver finds a forced win within `depth` plies but
+    # some moves throw it away, with the set of moves that keep the win.
+    solvers = {m: SolverBot(m, max_depth=depth) for m in (Mark.X, Mark.O)}
+
+    def score(s: GameState) -> int:
+        if s.is_terminal():
+            return 0
+        solver = solvers[s.to_move]
+        solver.reset()
+        solver.choose_move(s)
+        return solver.last_score
+
+    rng = random.Random(seed)
+    out = []
+    while len(out) < n:
+        s = new_game(size, win_k)
+        for _ in range(rng.randrange(4, size * size // 2)):
+            if s.is_terminal():
+                break
+            s = s.apply(rng.choice(s.board.available_moves()))
+        if s.is_terminal() or score(s) <= DECISIVE:
+            continue
+        moves = s.board.available_moves()
+        good = set()
+        for m in moves:
+            child = s.apply(m)
+            if child.winner() == s.to_move or -score(child) > DECISIVE:
+                good.add(m)
+        if len(good) < len(moves):
+            out.append((s, good))
+    return out
+
+
+def _forced_win_rates(name: str, make: Callable[[Mark, int], MCTSBot]) -> List[Result]:
+    # Share of forced-win positions on 5x5 where MCTS keeps the win, per
+    # iteration budget.
+    positions = _forced_wins(5, 4, 30, depth=5)
+    results = []
+    for iterations in (100, 300, 1000):
+        found = sum(make(s.to_move, iterations).choose_move(s) in good for s, good in positions)
+        results.append(
+            Result(f"forced_wins_{name}_{iterations}", 100.0 * found / len(positions), "%")
+        )
+    return results
+
+
+def bench_rollout_strength() -> List[Result]:
+    results = []
+    for policy in ROLLOUTS:
+        results.extend(
+            _forced_win_rates(
+                policy,
+                lambda mark, n: MCTSBot(mark, n, seed=0, rollout=make_rollout(policy)),
+            )
+        )
+    return results
+
+
+def bench_rave_strength() -> List[Result]:
+    return _forced_win_rates("rave", lambda mark, n: MCTSBot(mark, n, seed=0, rave=True))
+
+
+def bench_mcts(size: int) -> List[Result]:
+    state = new_game(size)
+    if size == 5:
+        state = new_game(5, 4)
+
+    def run() -> None:
+        MCTSBot(Mark.X, seed=0).choose_move(state)
+
+    return [_latency(f"mcts_first_move_{size}x{size}", run, repeat=1 if size == 5 else 3)]
+
+
+def bench_gomoku() -> List[Result]:
+    # One move on a 15x15 five-in-a-row board ten plies in, with candidate
+    # moves limited to the default radius.
+    rng = random.Random(0)
+    state = new_game(15, 5, default_radius(15))
+    for _ in range(10):
+        state = state.apply(rng.choice(state.candidate_moves()))
+
+    def mcts() -> None:
+        MCTSBot(state.to_move, iterations=1000, seed=0).choose_move(state)
+
+    def solver() -> None:
+        SolverBot(state.to_move, max_depth=3).choose_move(state)
+
+    return [
+        _latency("mcts_move_15x15", mcts, repeat=1),
+        _latency("solver_move_15x15", solver, repeat=1),
+    ]
+
+
+def bench_q_training() -> List[Result]:
+    episodes = 3000
+
+    def run() -> None:
+        QTrainer(QParams(), seed=0).train_selfplay(episodes)
+
+    return [_rate("q_train_3x3", run, episodes, repeat=3)]
+
+
+def bench_q_load() -> List[Result]:
+    trainer = QTrainer(QParams(), seed=0)
+    q = trainer.train_selfplay(5000)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "q.json"
+        save_q_table(path, q)
+        return [_latency("load_q_table", lambda: load_q_table(path), repeat=20)]
+
+
+BENCHMARKS: Dict[str, Callable[[], List[Result]]] = {
+    "board3": lambda: bench_board(3, 3),
+    "board5": lambda: bench_board(5, 4),
+    "rollouts3": lambda: bench_rollouts(3, 3),
+    "rollouts5": lambda: bench_rollouts(5, 4),
+    "rollouts5_tactical": lambda: bench_rollouts(5, 4, "tactical"),
+    "rollout_strength": bench_rollout_strength,
+    "rave_strength": bench_rave_strength,
+    "mcts3": lambda: bench_mcts(3),
+    "mcts4": lambda: bench_mcts(4),
+    "mcts5": lambda: bench_mcts(5),
+    "gomoku": bench_gomoku,
+    "q_train": bench_q_training,
+    "q_load": bench_q_load,
+}
+
+
+def run(names: Optional[List[str]] = None) -> List[Result]:
+    results: List[Result] = []
+    for name in names or list(BENCHMARKS):
+        results.extend(BENCHMARKS[name]())
+    return results
+
+
+def load_baseline(path: Path) -> Dict[str, Result]:
+    if not path.exists():
+        return {}
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return {name: Result(name, **entry) for name, entry in data.items()}
+
+
+def save_baseline(path: Path, results: List[Result]) -> None:
+    data = load_baseline(path)
+    data.update({r.name: r for r in results})
+    out = {
+        name: {"value": r.value, "unit": r.unit, "higher_is_better": r.higher_is_better}
+        for name, r in sorted(data.items())
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(out, indent=2) + "\n", encoding="utf-8")
+
+
+def regressions(
+    results: List[Result], baseline: Dict[str, Result], threshold: float
+) -> List[str]:
+    # A metric regresses when it is worse than the baseline by more than
+    # `threshold` as a fraction of the baseline value.
+    out = []
+    for r in results:
+        base = baseline.get(r.name)
+        if base is None or base.value <= 0:
+            continue
+        change = (r.value - base.value) / base.value
+        if not r.higher_is_better:
+            change = -change
+        if change < -threshold:
+            out.append(
+                f"{r.name}: {r.value:.4g} {r.unit} vs baseline {base.value:.4g} ({change:+.0%})"
+            )
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="tictactoe.bench")
+    parser.add_argument("names", nargs="*", metavar="NAME")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--save", action="store_true")
+    args = parser.parse_args(argv)
+    unknown = [n for n in args.names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}; choose from {', '.join(BENCHMARKS)}")
+
+    baseline = load_baseline(args.baseline)
+    results = run(args.names)
+    for r in results:
+        base = baseline.get(r.name)
+        ref = f"  (baseline {base.value:.4g})" if base is not None else ""
+        print(f"{r.name:28s} {r.value:12.4g} {r.unit}{ref}")
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"Saved: {args.baseline}")
+        return 0
+    failed = regressions(results, baseline, args.threshold)
+    for line in failed:
+        print(f"REGRESSION {line}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,46 +1,158 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Iterable, List, Optional, Sequence, Tuple
+from functools import lru_cache
+from typing import List, Optional, Tuple
 
 from tictactoe.core.types import Mark, Move
 
 
+@lru_cache(maxsize=None)
+def cell_moves(size: int) -> Tuple[Move, ...]:
+    return tuple(Move(i // size, i % size) for i in range(size * size))
+
+
+@lru_cache(maxsize=None)
+def full_mask(size: int) -> int:
+    return (1 << (size * size)) - 1
+
+
+@lru_cache(maxsize=None)
+def win_masks(size: int, win_k: int) -> Tuple[int, ...]:
+    n = size
+    k = win_k
+    masks: List[int] = []
+
+    def line(r: int, c: int, dr: int, dc: int) -> int:
+        m = 0
+        for i in range(k):
+            m |= 1 << ((r + dr * i) * n + (c + dc * i))
+        return m
+
+    for r in range(n):
+        for c in range(n - k + 1):
+            masks.append(line(r, c, 0, 1))
+
+    for c in range(n):
+        for r in range(n - k + 1):
+            masks.append(line(r, c, 1, 0))
+
+    for r in range(n - k + 1):
+        for c in range(n - k + 1):
+            masks.append(line(r, c, 1, 1))
+
+    for r in range(n - k + 1):
+        for c in range(k - 1, n):
+            masks.append(line(r, c, 1, -1))
+
+    return tuple(masks)
+
+
+@lru_cache(maxsize=None)
+def masks_through(size: int, win_k: int) -> Tuple[Tuple[int, ...], ...]:
+    masks = win_masks(size, win_k)
+    return tuple(tuple(m for m in masks if m >> i & 1) for i in range(size * size))
+
+
+@lru_cache(maxsize=None)
+def lines_through(size: int, win_k: int) -> Tuple[Tuple[int, ...], ...]:
+    # Like masks_through, but indices into win_masks.
+    masks = win_masks(size, win_k)
+    return tuple(
+        tuple(j for j, m in enumerate(masks) if m >> i & 1) for i in range(size * size)
+    )
+
+
+@lru_cache(maxsize=None)
+def near_masks(size: int, radius: int) -> Tuple[int, ...]:
+    # Per cell, the cells at most `radius` rows and columns away.
+    out = []
+    for i in range(size * size):
+        r, c = divmod(i, size)
+        m = 0
+        for rr in range(max(0, r - radius), min(size, r + radius + 1)):
+            for cc in range(max(0, c - radius), min(size, c + radius + 1)):
+                m |= 1 << (rr * size + cc)
+        out.append(m)
+    return tuple(out)
+
+
+def moves_of(bits: int, size: int) -> List[Move]:
+    cells = cell_moves(size)
+    out = []
+    while bits:
+        low = bits & -bits
+        out.append(cells[low.bit_length() - 1])
+        bits ^= low
+    return out
+
+
 @dataclass
 class Board:
     size: int
-    grid: List[List[Optional[Mark]]]
+    x_bits: int = 0
+    o_bits: int = 0
 
     @classmethod
     def empty(cls, size: int) -> "Board":
-        return cls(size=size, grid=[[None for _ in range(size)] for _ in range(size)])
+        return cls(size=size)
+
+    @classmethod
+    def from_grid(cls, grid: List[List[Optional[Mark]]]) -> "Board":
+        board = cls.empty(len(grid))
+        for r, row in enumerate(grid):
+            for c, cell in enumerate(row):
+                if cell is not None:
+                    board.place(Move(r, c), cell)
+        return board
 
     def copy(self) -> "Board":
-        return Board(self.size, [row[:] for row in self.grid])
+        return Board(self.size, self.x_bits, self.o_bits)
+
+    def index(self, move: Move) -> int:
+        return move.row * self.size + move.col
 
     def in_bounds(self, move: Move) -> bool:
         return 0 <= move.row < self.size and 0 <= move.col < self.size
 
+    def at(self, move: Move) -> Optional[Mark]:
+        bit = 1 << self.index(move)
+        if self.x_bits & bit:
+            return Mark.X
+        if self.o_bits & bit:
+            return Mark.O
+        return None
+
     def is_empty_at(self, move: Move) -> bool:
-        return self.grid[move.row][move.col] is None
+        return not (self.x_bits | self.o_bits) >> self.index(move) & 1
 
     def place(self, move: Move, mark: Mark) -> None:
         if not self.in_bounds(move):
             raise ValueError("Move out of bounds")
-        if not self.is_empty_at(move):
+        bit = 1 << self.index(move)
+        if (self.x_bits | self.o_bits) & bit:
             raise ValueError("Cell is not empty")
-        self.grid[move.row][move.col] = mark
+        if mark == Mark.X:
+            self.x_bits |= bit
+        else:
+            self.o_bits |= bit
 
     def available_moves(self) -> List[Move]:
-        moves: List[Move] = []
-        for r in range(self.size):
-            for c in range(self.size):
-                if self.grid[r][c] is None:
-                    moves.append(Move(r, c))
-        return moves
+        occupied = self.x_bits | self.o_bits
+        cells = cell_moves(self.size)
+        return [cells[i] for i in range(len(cells)) if not occupied >> i & 1]
+
+    def count(self) -> int:
+        return (self.x_bits | self.o_bits).bit_count()
 
     def is_full(self) -> bool:
-        return all(cell is not None for row in self.grid for cell in row)
+        return (self.x_bits | self.o_bits) == full_mask(self.size)
+
+    @property
+    def grid(self) -> List[List[Optional[Mark]]]:
+        cells = cell_moves(self.size)
+        flat = [self.at(m) for m in cells]
+        return [flat[r * self.size:(r + 1) * self.size] for r in range(self.size)]
 
     def as_tuple(self) -> Tuple[Tuple[str, ...], ...]:
         def cell_to_str(x: Optional[Mark]) -> str:
@@ -49,35 +161,21 @@ class Board:
         return tuple(tuple(cell_to_str(c) for c in row) for row in self.grid)
 
     def __str__(self) -> str:
-        rows = []
-        for r in range(self.size):
-            rows.append(" ".join("." if c is None else c.value for c in self.grid[r]))
-        return "\n".join(rows)
-
-    def _lines(self, win_k: int) -> Iterable[Sequence[Optional[Mark]]]:
-        n = self.size
-        k = win_k
-
-        for r in range(n):
-            for c in range(n - k + 1):
-                yield [self.grid[r][c + i] for i in range(k)]
-
-        for c in range(n):
-            for r in range(n - k + 1):
-                yield [self.grid[r + i][c] for i in range(k)]
-
-        for r in range(n - k + 1):
-            for c in range(n - k + 1):
-                yield [self.grid[r + i][c + i] for i in range(k)]
-
-        for r in range(n - k + 1):
-            for c in range(k - 1, n):
-                yield [self.grid[r + i][c - i] for i in range(k)]
+        return "\n".join(" ".join(row) for row in self.as_tuple())
 
     def winner(self, win_k: int) -> Optional[Mark]:
-        for line in self._lines(win_k):
-            if line[0] is None:
-                continue
-            if all(cell == line[0] for cell in line):
-                return line[0]
+        x = self.x_bits
+        o = self.o_bits
+        for mask in win_masks(self.size, win_k):
+            if x & mask == mask:
+                return Mark.X
+            if o & mask == mask:
+                return Mark.O
         return None
+
+    def wins_through(self, move: Move, mark: Mark, win_k: int) -> bool:
+        bits = self.x_bits if mark == Mark.X else self.o_bits
+        for mask in masks_through(self.size, win_k)[self.index(move)]:
+            if bits & mask == mask:
+                return True
+        return False
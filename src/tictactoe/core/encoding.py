@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Tuple
+
+from tictactoe.core.board import Board
+from tictactoe.core.game import GameState
+from tictactoe.core.symmetry import canonical, permutations
+from tictactoe.core.types import Move
+
+
+@lru_cache(maxsize=None)
+def _powers(size: int) -> Tuple[int, ...]:
+    return tuple(3**i for i in range(size * size))
+
+
+def state_id(board: Board) -> int:
+    x = board.x_bits
+    o = board.o_bits
+    sid = 0
+    for i, p in enumerate(_powers(board.size)):
+        if x >> i & 1:
+            sid += p
+        elif o >> i & 1:
+            sid += 2 * p
+    return sid
+
+
+def board_from_id(sid: int, size: int) -> Board:
+    board = Board.empty(size)
+    for i in range(size * size):
+        sid, digit = divmod(sid, 3)
+        if digit == 1:
+            board.x_bits |= 1 << i
+        elif digit == 2:
+            board.o_bits |= 1 << i
+    return board
+
+
+def num_states(size: int) -> int:
+    return 3 ** (size * size)
+
+
+@lru_cache(maxsize=1 << 16)
+def _encode(size: int, x_bits: int, o_bits: int) -> Tuple[int, int]:
+    board, sym = canonical(Board(size, x_bits, o_bits))
+    return state_id(board), sym
+
+
+def encode_state(state: GameState) -> Tuple[int, int]:
+    # Base-3 id of the canonical board plus the symmetry that maps the real
+    # board onto it; actions must be encoded with the same symmetry.
+    board = state.board
+    return _encode(board.size, board.x_bits, board.o_bits)
+
+
+def encode_action(move: Move, sym: int, size: int) -> int:
+    return permutations(size)[sym][move.row * size + move.col]
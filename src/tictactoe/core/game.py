@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import List, Optional
 
-from tictactoe.core.board import Board
+from tictactoe.core.board import Board, full_mask, moves_of, near_masks
 from tictactoe.core.types import GameConfig, Mark, Move, other
+from tictactoe.core.zobrist import board_key, zobrist_keys
 
 
 @dataclass
@@ -12,17 +13,89 @@ class GameState:
     board: Board
     to_move: Mark
     config: GameConfig
+    # Derived from the board or the move history, so left out of equality:
+    # the same position reached in any order compares equal.
+    last_move: Optional[Move] = field(default=None, compare=False)
+    moves_played: int = field(default=-1, compare=False)
+    key: Optional[int] = field(default=None, compare=False)
+    # Cells near some stone, kept up to date by apply() in large-board mode.
+    near: Optional[int] = field(default=None, compare=False)
+    _winner: Optional[Mark] = field(default=None, init=False, repr=False, compare=False)
+    _terminal: Optional[bool] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.moves_played < 0:
+            self.moves_played = self.board.count()
+        if self.key is None:
+            self.key = board_key(self.board)
+        if self.near is None and self.config.radius is not None:
+            masks = near_masks(self.board.size, self.config.radius)
+            near = 0
+            bits = self.board.x_bits | self.board.o_bits
+            while bits:
+                low = bits & -bits
+                near |= masks[low.bit_length() - 1]
+                bits ^= low
+            self.near = near
+
+    def _resolve(self) -> None:
+        self._winner = self.board.winner(self.config.k())
+        self._terminal = self._winner is not None or self.is_full()
 
     def winner(self) -> Optional[Mark]:
-        return self.board.winner(self.config.k())
+        if self._terminal is None:
+            self._resolve()
+        return self._winner
+
+    def is_full(self) -> bool:
+        return self.moves_played == self.board.size * self.board.size
 
     def is_terminal(self) -> bool:
-        return self.winner() is not None or self.board.is_full()
+        if self._terminal is None:
+            self._resolve()
+        return self._terminal
+
+    def candidate_bits(self) -> int:
+        board = self.board
+        size = board.size
+        free = full_mask(size) & ~(board.x_bits | board.o_bits)
+        if self.config.radius is None:
+            return free
+        if not self.moves_played:
+            return 1 << (size // 2 * size + size // 2)
+        # A board filled around every stone still has moves further out.
+        return self.near & free or free
+
+    def candidate_moves(self) -> List[Move]:
+        return moves_of(self.candidate_bits(), self.board.size)
 
     def apply(self, move: Move) -> "GameState":
+        mover = self.to_move
         new_board = self.board.copy()
-        new_board.place(move, self.to_move)
-        return GameState(board=new_board, to_move=other(self.to_move), config=self.config)
+        new_board.place(move, mover)
+        cell = new_board.index(move)
+        cell_keys = zobrist_keys(new_board.size)[cell]
+        near = self.near
+        if near is not None:
+            near |= near_masks(new_board.size, self.config.radius)[cell]
+        nxt = GameState(
+            board=new_board,
+            to_move=other(mover),
+            config=self.config,
+            last_move=move,
+            moves_played=self.moves_played + 1,
+            key=self.key ^ cell_keys[0 if mover == Mark.X else 1],
+            near=near,
+        )
+        # Only lines through the new cell can have changed, so the outcome is
+        # known incrementally as long as this state's own outcome is known.
+        if self._terminal is not None:
+            if self._winner is not None:
+                nxt._winner = self._winner
+            elif new_board.wins_through(move, mover, self.config.k()):
+                nxt._winner = mover
+            nxt._terminal = nxt._winner is not None or nxt.is_full()
+        return nxt
 
     def reward_for(self, player: Mark) -> float:
         w = self.winner()
@@ -31,6 +104,20 @@ class GameState:
         return 1.0 if w == player else -1.0
 
 
-def new_game(size: int = 3, win_k: Optional[int] = None) -> GameState:
-    cfg = GameConfig(size=size, win_k=win_k)
-    return GameState(board=Board.empty(size), to_move=Mark.X, config=cfg)
+def default_k(size: int) -> int:
+    # Past 5x5, play gomoku-style five in a row.
+    return size if size <= 5 else 5
+
+
+def default_radius(size: int) -> Optional[int]:
+    # Boards up to 5x5 are small enough to consider every empty cell.
+    return None if size <= 5 else 2
+
+
+def new_game(
+    size: int = 3, win_k: Optional[int] = None, radius: Optional[int] = None
+) -> GameState:
+    cfg = GameConfig(size=size, win_k=win_k, radius=radius)
+    state = GameState(board=Board.empty(size), to_move=Mark.X, config=cfg, moves_played=0, key=0)
+    state._terminal = False
+    return state
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import random
+from typing import List, Optional, Tuple
+
+from tictactoe.core.board import full_mask, masks_through, near_masks
+from tictactoe.core.game import GameState
+from tictactoe.core.types import Mark, other
+
+
+class Playout:
+    # Scratch position for make/unmake play: one pair of bitmasks, an undo
+    # stack and a swap-remove list of empty cells, so a random playout does
+    # not allocate boards or states.
+    def __init__(self, size: int, win_k: int) -> None:
+        self.size = size
+        self.win_k = win_k
+        self._through = masks_through(size, win_k)
+        self.x_bits = 0
+        self.o_bits = 0
+        self.to_move = Mark.X
+        self.winner: Optional[Mark] = None
+        self.empty: List[int] = []
+        self._where: List[int] = [0] * (size * size)
+        self._stack: List[int] = []
+        # Stones of the last position a rollout reached, kept by rewind().
+        self.final_x = 0
+        self.final_o = 0
+        # Large-board mode (GameConfig.radius): cells near some stone, as in
+        # GameState.near, with the previous masks on their own undo stack.
+        self._near_masks: Optional[Tuple[int, ...]] = None
+        self.near = 0
+        self._near_stack: List[int] = []
+
+    def load(self, state: GameState) -> None:
+        board = state.board
+        self.x_bits = board.x_bits
+        self.o_bits = board.o_bits
+        self.to_move = state.to_move
+        self.winner = state.winner()
+        occupied = board.x_bits | board.o_bits
+        empty = self.empty
+        empty.clear()
+        for i in range(self.size * self.size):
+            if not occupied >> i & 1:
+                self._where[i] = len(empty)
+                empty.append(i)
+        self._stack.clear()
+        radius = state.config.radius
+        self._near_masks = None if radius is None else near_masks(self.size, radius)
+        self.near = state.near or 0
+        self._near_stack.clear()
+
+    def depth(self) -> int:
+        return len(self._stack) // 2
+
+    def is_terminal(self) -> bool:
+        return self.winner is not None or not self.empty
+
+    def candidate_cells(self) -> List[int]:
+        # GameState.candidate_bits for the current position, as cell indices.
+        if self._near_masks is None:
+            return sorted(self.empty)
+        size = self.size
+        occupied = self.x_bits | self.o_bits
+        if not occupied:
+            return [size // 2 * size + size // 2]
+        free = full_mask(size) & ~occupied
+        bits = self.near & free or free
+        cells = []
+        while bits:
+            low = bits & -bits
+            cells.append(low.bit_length() - 1)
+            bits ^= low
+        return cells
+
+    def play(self, cell: int) -> None:
+        self.play_at(self._where[cell])
+
+    def play_at(self, pos: int) -> None:
+        empty = self.empty
+        cell = empty[pos]
+        last = empty.pop()
+        if last != cell:
+            empty[pos] = last
+            self._where[last] = pos
+        self._stack.append(pos)
+        self._stack.append(cell)
+        if self._near_masks is not None:
+            self._near_stack.append(self.near)
+            self.near |= self._near_masks[cell]
+
+        mover = self.to_move
+        bit = 1 << cell
+        if mover == Mark.X:
+            self.x_bits |= bit
+            bits = self.x_bits
+        else:
+            self.o_bits |= bit
+            bits = self.o_bits
+        for mask in self._through[cell]:
+            if bits & mask == mask:
+                self.winner = mover
+                break
+        self.to_move = other(mover)
+
+    def undo(self) -> None:
+        cell = self._stack.pop()
+        pos = self._stack.pop()
+        empty = self.empty
+        if pos < len(empty):
+            moved = empty[pos]
+            empty.append(moved)
+            self._where[moved] = len(empty) - 1
+            empty[pos] = cell
+        else:
+            empty.append(cell)
+        self._where[cell] = pos
+
+        mask = ~(1 << cell)
+        self.x_bits &= mask
+        self.o_bits &= mask
+        self.to_move = other(self.to_move)
+        self.winner = None
+        if self._near_masks is not None:
+            self.near = self._near_stack.pop()
+
+    def rewind(self, depth: int) -> None:
+        self.final_x = self.x_bits
+        self.final_o = self.o_bits
+        while len(self._stack) > 2 * depth:
+            self.undo()
+
+    def rollout(self, rng: random.Random) -> Optional[Mark]:
+        start = self.depth()
+        rand = rng.random
+        empty = self.empty
+        while self.winner is None and empty:
+            self.play_at(int(rand() * len(empty)))
+        winner = self.winner
+        self.rewind(start)
+        return winner
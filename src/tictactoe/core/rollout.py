@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import random
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple, Type
+
+from tictactoe.core.board import lines_through, win_masks
+from tictactoe.core.playout import Playout
+from tictactoe.core.types import Mark
+
+
+class RolloutPolicy(ABC):
+    # Plays the position loaded in `pl` to the end and returns the winner;
+    # `pl` must be left as it was found, via pl.rewind() so the final
+    # stones are recorded.
+    name = ""
+
+    @abstractmethod
+    def rollout(self, pl: Playout, rng: random.Random) -> Optional[Mark]:
+        raise NotImplementedError
+
+
+class RandomRollout(RolloutPolicy):
+    name = "random"
+
+    def rollout(self, pl: Playout, rng: random.Random) -> Optional[Mark]:
+        return pl.rollout(rng)
+
+
+def _open_cell(hot: List[int], blocked: List[int], masks: Tuple[int, ...], occupied: int) -> int:
+    # Free cell of the last queued line that the other side has not entered;
+    # lines it has entered are dead for good, since rollouts only add stones.
+    while hot:
+        i = hot[-1]
+        if blocked[i]:
+            hot.pop()
+            continue
+        return (masks[i] & ~occupied).bit_length() - 1
+    return -1
+
+
+class TacticalRollout(RolloutPolicy):
+    # Win if possible, else block the opponent's win, else play at random.
+    # Stone counts per line are updated as stones land and lines one stone
+    # short of k are queued per side, so finding a win or a block checks the
+    # queues instead of rescanning every line on every ply.
+    name = "tactical"
+
+    def rollout(self, pl: Playout, rng: random.Random) -> Optional[Mark]:
+        masks = win_masks(pl.size, pl.win_k)
+        through = lines_through(pl.size, pl.win_k)
+        need = pl.win_k - 1
+        x = pl.x_bits
+        o = pl.o_bits
+        x_count = [(m & x).bit_count() for m in masks]
+        o_count = [(m & o).bit_count() for m in masks]
+        x_hot = [i for i, n in enumerate(x_count) if n == need and not o_count[i]]
+        o_hot = [i for i, n in enumerate(o_count) if n == need and not x_count[i]]
+        if pl.to_move == Mark.X:
+            mine, theirs, my_hot, their_hot = x_count, o_count, x_hot, o_hot
+        else:
+            mine, theirs, my_hot, their_hot = o_count, x_count, o_hot, x_hot
+
+        start = pl.depth()
+        rand = rng.random
+        empty = pl.empty
+        while pl.winner is None and empty:
+            occupied = pl.x_bits | pl.o_bits
+            cell = _open_cell(my_hot, theirs, masks, occupied)
+            if cell < 0:
+                cell = _open_cell(their_hot, mine, masks, occupied)
+            if cell < 0:
+                pos = int(rand() * len(empty))
+                cell = empty[pos]
+                pl.play_at(pos)
+            else:
+                pl.play(cell)
+            for i in through[cell]:
+                n = mine[i] + 1
+                mine[i] = n
+                if n == need and not theirs[i]:
+                    my_hot.append(i)
+            mine, theirs, my_hot, their_hot = theirs, mine, their_hot, my_hot
+
+        winner = pl.winner
+        pl.rewind(start)
+        return winner
+
+
+ROLLOUTS: Dict[str, Type[RolloutPolicy]] = {
+    RandomRollout.name: RandomRollout,
+    TacticalRollout.name: TacticalRollout,
+}
+
+
+def make_rollout(name: str) -> RolloutPolicy:
+    if name not in ROLLOUTS:
+        raise ValueError(f"Unknown rollout policy: {name}")
+    return ROLLOUTS[name]()
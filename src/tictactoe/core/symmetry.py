@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Tuple
+
+from tictactoe.core.board import Board, cell_moves
+from tictactoe.core.types import Move
+
+
+@lru_cache(maxsize=None)
+def permutations(size: int) -> Tuple[Tuple[int, ...], ...]:
+    n = size - 1
+    maps = (
+        lambda r, c: (r, c),
+        lambda r, c: (c, n - r),
+        lambda r, c: (n - r, n - c),
+        lambda r, c: (n - c, r),
+        lambda r, c: (r, n - c),
+        lambda r, c: (n - r, c),
+        lambda r, c: (c, r),
+        lambda r, c: (n - c, n - r),
+    )
+    perms = []
+    for f in maps:
+        perm = []
+        for i in range(size * size):
+            r, c = f(i // size, i % size)
+            perm.append(r * size + c)
+        perms.append(tuple(perm))
+    return tuple(perms)
+
+
+@lru_cache(maxsize=None)
+def inverse_permutations(size: int) -> Tuple[Tuple[int, ...], ...]:
+    inverses = []
+    for perm in permutations(size):
+        inv = [0] * len(perm)
+        for i, j in enumerate(perm):
+            inv[j] = i
+        inverses.append(tuple(inv))
+    return tuple(inverses)
+
+
+@lru_cache(maxsize=None)
+def _byte_tables(size: int) -> Tuple[Tuple[Tuple[int, ...], ...], ...]:
+    # For every symmetry and every 8-cell chunk of the bitmask, the permuted
+    # bits of all 256 chunk values, so a transform is one lookup per byte.
+    cells = size * size
+    chunks = (cells + 7) // 8
+    tables = []
+    for perm in permutations(size):
+        per_chunk = []
+        for j in range(chunks):
+            table = []
+            for value in range(256):
+                out = 0
+                for b in range(8):
+                    i = 8 * j + b
+                    if value >> b & 1 and i < cells:
+                        out |= 1 << perm[i]
+                table.append(out)
+            per_chunk.append(tuple(table))
+        tables.append(tuple(per_chunk))
+    return tuple(tables)
+
+
+def transform_bits(bits: int, sym: int, size: int) -> int:
+    tables = _byte_tables(size)[sym]
+    out = 0
+    j = 0
+    while bits:
+        out |= tables[j][bits & 0xFF]
+        bits >>= 8
+        j += 1
+    return out
+
+
+def transform_board(board: Board, sym: int) -> Board:
+    return Board(
+        board.size,
+        transform_bits(board.x_bits, sym, board.size),
+        transform_bits(board.o_bits, sym, board.size),
+    )
+
+
+def canonical(board: Board) -> Tuple[Board, int]:
+    size = board.size
+    best = (board.x_bits, board.o_bits)
+    best_sym = 0
+    for sym in range(1, 8):
+        cand = (
+            transform_bits(board.x_bits, sym, size),
+            transform_bits(board.o_bits, sym, size),
+        )
+        if cand < best:
+            best = cand
+            best_sym = sym
+    return Board(size, best[0], best[1]), best_sym
+
+
+def to_canonical(move: Move, sym: int, size: int) -> Move:
+    return cell_moves(size)[permutations(size)[sym][move.row * size + move.col]]
+
+
+def from_canonical(move: Move, sym: int, size: int) -> Move:
+    return cell_moves(size)[inverse_permutations(size)[sym][move.row * size + move.col]]
@@ -30,6 +30,9 @@ def other(mark: Mark) -> Mark:
 class GameConfig:
     size: int = 3
     win_k: Optional[int] = None
+    # Large-board mode: only empty cells within this many rows and columns
+    # of a stone are candidate moves. None means every empty cell.
+    radius: Optional[int] = None
 
     def k(self) -> int:
         return self.win_k if self.win_k is not None else self.size
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import random
+from functools import lru_cache
+from typing import Tuple
+
+from tictactoe.core.board import Board
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(size: int) -> Tuple[Tuple[int, int], ...]:
+    rng = random.Random(size * 0x9E3779B1)
+    return tuple((rng.getrandbits(64), rng.getrandbits(64)) for _ in range(size * size))
+
+
+def board_key(board: Board) -> int:
+    key = 0
+    for i, (kx, ko) in enumerate(zobrist_keys(board.size)):
+        if board.x_bits >> i & 1:
+            key ^= kx
+        elif board.o_bits >> i & 1:
+            key ^= ko
+    return key
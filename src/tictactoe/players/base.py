@@ -1,15 +1,55 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from typing import Any, Optional, Tuple
 
 from tictactoe.core.game import GameState
 from tictactoe.core.types import Mark, Move
+from tictactoe.stats import StatsHook
 
 
 class Player(ABC):
     def __init__(self, mark: Mark) -> None:
         self.mark = mark
+        self.stats_hook: Optional[StatsHook] = None
+        self.cancelled = False
+        self.progress = 0
+        self.progress_total = 0
 
     @abstractmethod
     def choose_move(self, state: GameState) -> Move:
         raise NotImplementedError
+
+    def set_stats_hook(self, hook: Optional[StatsHook]) -> None:
+        self.stats_hook = hook
+
+    def emit_stats(self, state: GameState, elapsed: float, **fields: Any) -> None:
+        if self.stats_hook is None:
+            return
+        record = {
+            "player": type(self).__name__,
+            "mark": self.mark.value,
+            "ply": state.moves_played,
+            "elapsed": round(elapsed, 6),
+        }
+        record.update(fields)
+        self.stats_hook(record)
+
+    def cancel(self) -> None:
+        # Called from another thread: bots that search check the flag and
+        # return their best move so far.
+        self.cancelled = True
+
+    def reset_cancel(self) -> None:
+        self.cancelled = False
+        self.progress = 0
+
+    def search_progress(self) -> Tuple[int, int]:
+        # (work done, expected total or 0 if unknown) for the running search.
+        return self.progress, self.progress_total
+
+    def reset(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
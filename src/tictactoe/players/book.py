@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import time
+from typing import Optional, Tuple
+
+from tictactoe.core.game import GameState
+from tictactoe.core.types import Move
+from tictactoe.players.base import Player
+from tictactoe.stats import StatsHook
+from tictactoe.training.book import OpeningBook
+
+
+class BookPlayer(Player):
+    # Answers from the book when it has the position, otherwise asks the
+    # wrapped player.
+    def __init__(self, inner: Player, book: OpeningBook) -> None:
+        super().__init__(inner.mark)
+        self.inner = inner
+        self.book = book
+        self.hits = 0
+
+    def set_stats_hook(self, hook: Optional[StatsHook]) -> None:
+        self.stats_hook = hook
+        self.inner.set_stats_hook(hook)
+
+    def choose_move(self, state: GameState) -> Move:
+        if self.book.covers(state):
+            start = time.perf_counter()
+            move = self.book.lookup(state)
+            if move is not None:
+                self.hits += 1
+                self.emit_stats(state, time.perf_counter() - start, book_hit=True)
+                return move
+        return self.inner.choose_move(state)
+
+    def cancel(self) -> None:
+        self.inner.cancel()
+
+    def reset_cancel(self) -> None:
+        self.inner.reset_cancel()
+
+    def search_progress(self) -> Tuple[int, int]:
+        return self.inner.search_progress()
+
+    def reset(self) -> None:
+        self.inner.reset()
+
+    def close(self) -> None:
+        self.inner.close()
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import math
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from tictactoe.core.board import cell_moves
+from tictactoe.core.game import GameState
+from tictactoe.core.rollout import RolloutPolicy
+from tictactoe.core.types import Mark, Move
+from tictactoe.players.mcts import MCTSBot
+
+
+class CompactTree:
+    # Struct-of-arrays MCTS tree. Node 0 is the root; the children of a node
+    # are a contiguous block [first_child, first_child + num_children), and a
+    # node's position is recovered by replaying the cells on its parent chain.
+    def __init__(self) -> None:
+        self.visits = array("i")
+        self.value_sum = array("d")
+        self.parent = array("i")
+        self.cell = array("h")
+        self.first_child = array("i")
+        self.num_children = array("h")
+        self.add(-1, -1)
+
+    def __len__(self) -> int:
+        return len(self.visits)
+
+    def add(self, parent: int, cell: int) -> int:
+        self.visits.append(0)
+        self.value_sum.append(0.0)
+        self.parent.append(parent)
+        self.cell.append(cell)
+        self.first_child.append(-1)
+        self.num_children.append(0)
+        return len(self.visits) - 1
+
+    def expand(self, node: int, cells: List[int]) -> int:
+        first = len(self.visits)
+        for cell in cells:
+            self.add(node, cell)
+        self.first_child[node] = first
+        self.num_children[node] = len(cells)
+        return first
+
+    def children(self, node: int) -> range:
+        first = self.first_child[node]
+        if first < 0:
+            return range(0)
+        return range(first, first + self.num_children[node])
+
+    def nbytes(self) -> int:
+        arrays = (
+            self.visits,
+            self.value_sum,
+            self.parent,
+            self.cell,
+            self.first_child,
+            self.num_children,
+        )
+        return sum(a.itemsize * len(a) for a in arrays)
+
+
+class CompactMCTSBot(MCTSBot):
+    # Plain UCT over a CompactTree rebuilt for every move: no tree reuse,
+    # transpositions, pondering or RAVE, so those options are not accepted.
+    def __init__(
+        self,
+        mark: Mark,
+        iterations: Optional[int] = None,
+        c: float = 1.4,
+        seed: Optional[int] = None,
+        time_budget: Optional[float] = None,
+        game_time: Optional[float] = None,
+        rollout: Optional[RolloutPolicy] = None,
+    ) -> None:
+        super().__init__(
+            mark,
+            iterations=iterations,
+            c=c,
+            seed=seed,
+            reuse_tree=False,
+            time_budget=time_budget,
+            game_time=game_time,
+            rollout=rollout,
+        )
+
+    def search(
+        self,
+        state: GameState,
+        iterations: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ) -> CompactTree:
+        tree = CompactTree()
+        pl = self._scratch(state)
+        limit = self._limit(state, iterations, deadline)
+        self.progress_total = limit or 0
+        clock = time.perf_counter
+        log = math.log
+        sqrt = math.sqrt
+        c = self.c
+        mark = self.mark
+        policy = self.rollout_policy
+        visits = tree.visits
+        value_sum = tree.value_sum
+        parent = tree.parent
+        cells = tree.cell
+        first_child = tree.first_child
+        num_children = tree.num_children
+        timed = self.stats_hook is not None
+        select = rollout = backprop = 0.0
+        max_depth = 0
+
+        done = 0
+        while (limit is None or done < limit) and not self.cancelled:
+            if timed:
+                t0 = clock()
+            node = 0
+            while not pl.is_terminal():
+                first = first_child[node]
+                if first < 0:
+                    node = tree.expand(node, pl.candidate_cells())
+                    pl.play(cells[node])
+                    break
+                sign = 1.0 if pl.to_move == mark else -1.0
+                pv = log(max(visits[node], 1))
+                best = first
+                best_score = -10**9
+                for ch in range(first, first + num_children[node]):
+                    v = visits[ch]
+                    if v == 0:
+                        best = ch
+                        break
+                    score = sign * value_sum[ch] / v + c * sqrt(pv / v)
+                    if score > best_score:
+                        best_score = score
+                        best = ch
+                node = best
+                pl.play(cells[node])
+                if visits[node] == 0:
+                    break
+
+            if timed:
+                t1 = clock()
+                if pl.depth() > max_depth:
+                    max_depth = pl.depth()
+            winner = policy.rollout(pl, self.rng)
+            if timed:
+                t2 = clock()
+            reward = 0.0 if winner is None else (1.0 if winner == mark else -1.0)
+            while node >= 0:
+                visits[node] += 1
+                value_sum[node] += reward
+                node = parent[node]
+            while pl.depth():
+                pl.undo()
+            if timed:
+                t3 = clock()
+                select += t1 - t0
+                rollout += t2 - t1
+                backprop += t3 - t2
+
+            done += 1
+            self.progress = done
+            if deadline is not None and clock() >= deadline:
+                break
+        if timed:
+            # Expansion happens during the descent, so "select" covers both.
+            self.phases.add("select", select, done)
+            self.phases.add("rollout", rollout, done)
+            self.phases.add("backprop", backprop, done)
+        self.last_iterations = done
+        self.last_depth = max_depth
+        self.last_tree_size = len(tree)
+        return tree
+
+    def _think(self, state: GameState, deadline: Optional[float]) -> Dict[Move, int]:
+        tree = self.search(state, deadline=deadline)
+        moves = cell_moves(state.board.size)
+        return {moves[tree.cell[ch]]: tree.visits[ch] for ch in tree.children(0)}
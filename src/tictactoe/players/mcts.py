@@ -2,12 +2,18 @@ from __future__ import annotations
 
 import math
 import random
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from tictactoe.core.game import GameState
+from tictactoe.core.playout import Playout
+from tictactoe.core.rollout import RandomRollout, RolloutPolicy
 from tictactoe.core.types import Mark, Move
 from tictactoe.players.base import Player
+from tictactoe.stats import PhaseTimer
 
 
 @dataclass
@@ -18,86 +24,442 @@ class Node:
     visits: int = 0
     value_sum: float = 0.0
     children: Dict[Move, "Node"] = None
+    # All-moves-as-first statistics per cell for the side to move here, only
+    # kept in RAVE mode.
+    amaf_visits: Optional[List[int]] = None
+    amaf_sum: Optional[List[float]] = None
+    moves: Optional[List[Move]] = None
 
     def __post_init__(self) -> None:
         if self.children is None:
             self.children = {}
 
-    def uct_score(self, child: "Node", c: float) -> float:
+    def candidates(self) -> List[Move]:
+        if self.moves is None:
+            self.moves = self.state.candidate_moves()
+        return self.moves
+
+    def is_fully_expanded(self) -> bool:
+        return len(self.children) == len(self.candidates())
+
+    def uct_score(self, child: "Node", c: float, sign: float = 1.0) -> float:
         if child.visits == 0:
             return float("inf")
-        exploit = child.value_sum / child.visits
-        explore = c * math.sqrt(math.log(self.visits) / child.visits)
+        exploit = sign * child.value_sum / child.visits
+        explore = c * math.sqrt(math.log(max(self.visits, 1)) / child.visits)
         return exploit + explore
 
+    def rave_score(
+        self, move: Move, child: "Node", c: float, sign: float, equivalence: float
+    ) -> float:
+        # UCT on a blend of the child's own mean and its AMAF mean; the AMAF
+        # weight decays as sqrt(k / (3n + k)) with the child's visits n.
+        # `move` is the edge from this node: with transpositions a shared
+        # child may have been reached first through another parent, so its
+        # own `move` can name a different cell.
+        if child.visits == 0:
+            return float("inf")
+        value = child.value_sum / child.visits
+        if self.amaf_visits is not None:
+            cell = self.state.board.index(move)
+            n = self.amaf_visits[cell]
+            if n:
+                beta = math.sqrt(equivalence / (3 * child.visits + equivalence))
+                value = (1.0 - beta) * value + beta * self.amaf_sum[cell] / n
+        explore = c * math.sqrt(math.log(max(self.visits, 1)) / child.visits)
+        return sign * value + explore
+
+
+def default_iterations(size: int) -> int:
+    if size == 3:
+        return 1500
+    if size == 4:
+        return 5000
+    if size == 5:
+        return 20000
+    # Rollouts on large boards are long; see GameConfig.radius for the tree.
+    return 3000
+
+
+def move_budget(remaining: float, state: GameState) -> float:
+    own_moves_left = (state.board.size * state.board.size - state.moves_played + 1) // 2
+    return remaining / max(1, own_moves_left)
+
+
+def most_visited(visits: Dict[Move, int]) -> Optional[Move]:
+    best = None
+    best_visits = -1
+    for m, n in visits.items():
+        if n > best_visits:
+            best_visits = n
+            best = m
+    return best
+
+
+def root_visits(root: Node) -> Dict[Move, int]:
+    return {m: ch.visits for m, ch in root.children.items()}
+
+
+def tree_size(root: Node) -> int:
+    seen = {id(root)}
+    stack = [root]
+    while stack:
+        for ch in stack.pop().children.values():
+            if id(ch) not in seen:
+                seen.add(id(ch))
+                stack.append(ch)
+    return len(seen)
+
+
+def visits_record(visits: Dict[Move, int]) -> Dict[str, int]:
+    ordered = sorted(visits.items(), key=lambda kv: (kv[0].row, kv[0].col))
+    return {f"{m.row},{m.col}": n for m, n in ordered}
+
 
 class MCTSBot(Player):
-    def __init__(self, mark: Mark, iterations: int = 800, c: float = 1.4) -> None:
+    def __init__(
+        self,
+        mark: Mark,
+        iterations: Optional[int] = None,
+        c: float = 1.4,
+        seed: Optional[int] = None,
+        reuse_tree: bool = True,
+        transpositions: bool = False,
+        table_size: int = 200_000,
+        time_budget: Optional[float] = None,
+        game_time: Optional[float] = None,
+        ponder: bool = False,
+        ponder_iterations: Optional[int] = None,
+        rollout: Optional[RolloutPolicy] = None,
+        rave: bool = False,
+        rave_equivalence: float = 500.0,
+    ) -> None:
         super().__init__(mark)
         self.iterations = iterations
+        self.time_budget = time_budget
+        self.game_time = game_time
+        self.last_iterations = 0
+        self.last_depth = 0
+        self.last_tree_size = 0
+        self.phases = PhaseTimer()
+        self._clock_left = game_time
+        self._last_ply = -1
         self.c = c
+        self.rng = random.Random(seed)
+        self.rollout_policy = rollout or RandomRollout()
+        self.rave = rave
+        self.rave_equivalence = rave_equivalence
+        self.reuse_tree = reuse_tree
+        self.transpositions = transpositions
+        self.table_size = table_size
+        self._playout: Optional[Playout] = None
+        self._root: Optional[Node] = None
+        self._table: "OrderedDict[int, Node]" = OrderedDict()
+        self.ponder = ponder
+        self.ponder_iterations = ponder_iterations
+        self.last_ponder_iterations = 0
+        self._ponder_thread: Optional[threading.Thread] = None
+        self._ponder_stop = threading.Event()
+
+    def reset(self) -> None:
+        self.stop_pondering()
+        self.last_ponder_iterations = 0
+        self._root = None
+        self._table.clear()
+        self._clock_left = self.game_time
+        self._last_ply = -1
+
+    def _deadline(self, state: GameState) -> Optional[float]:
+        budget = self.time_budget
+        if self.game_time is not None:
+            if state.moves_played <= self._last_ply:
+                self._clock_left = self.game_time
+            self._last_ply = state.moves_played
+            share = move_budget(self._clock_left, state)
+            budget = share if budget is None else min(budget, share)
+        return None if budget is None else time.perf_counter() + budget
+
+    def _root_for(self, state: GameState) -> Node:
+        if self.transpositions:
+            node = self._table.get(state.key) if self.reuse_tree else None
+            if (
+                node is not None
+                and node.state.config == state.config
+                and node.state.board == state.board
+            ):
+                node.parent = None
+                return node
+            self._table.clear()
+            root = Node(state=state, parent=None, move=None)
+            self._table[state.key] = root
+            return root
+
+        node = self._root if self.reuse_tree else None
+        while node is not None and node.state.moves_played < state.moves_played:
+            mover = node.state.to_move
+            node = next(
+                (ch for m, ch in node.children.items() if state.board.at(m) == mover), None
+            )
+        if node is None or node.state.config != state.config or node.state.board != state.board:
+            return Node(state=state, parent=None, move=None)
+        node.parent = None
+        return node
+
+    def _limit(
+        self, state: GameState, iterations: Optional[int], deadline: Optional[float]
+    ) -> Optional[int]:
+        limit = iterations if iterations is not None else self.iterations
+        if limit is None and deadline is None:
+            limit = default_iterations(state.board.size)
+        return limit
+
+    def search(
+        self,
+        state: GameState,
+        iterations: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ) -> Node:
+        root = self._root_for(state)
+        limit = self._limit(state, iterations, deadline)
+        self.progress_total = limit or 0
+        if self.stats_hook is not None:
+            return self._search_timed(root, limit, deadline)
+        clock = time.perf_counter
+        done = 0
+        while (limit is None or done < limit) and not self.cancelled:
+            path = self._select(root)
+            leaf = self._expand(path)
+            result = self._rollout(leaf.state)
+            self._backprop(path, result)
+            done += 1
+            self.progress = done
+            if deadline is not None and clock() >= deadline:
+                break
+        self.last_iterations = done
+        return root
+
+    def _search_timed(self, root: Node, limit: Optional[int], deadline: Optional[float]) -> Node:
+        # Same loop as search() with per-phase timers; only used while a
+        # stats hook is attached.
+        clock = time.perf_counter
+        select = expand = rollout = backprop = 0.0
+        depth = 0
+        done = 0
+        while (limit is None or done < limit) and not self.cancelled:
+            t0 = clock()
+            path = self._select(root)
+            t1 = clock()
+            leaf = self._expand(path)
+            t2 = clock()
+            result = self._rollout(leaf.state)
+            t3 = clock()
+            self._backprop(path, result)
+            t4 = clock()
+            select += t1 - t0
+            expand += t2 - t1
+            rollout += t3 - t2
+            backprop += t4 - t3
+            if len(path) > depth:
+                depth = len(path)
+            done += 1
+            self.progress = done
+            if deadline is not None and t4 >= deadline:
+                break
+        for phase, seconds in (
+            ("select", select),
+            ("expand", expand),
+            ("rollout", rollout),
+            ("backprop", backprop),
+        ):
+            self.phases.add(phase, seconds, done)
+        self.last_iterations = done
+        self.last_depth = max(0, depth - 1)
+        self.last_tree_size = tree_size(root)
+        return root
 
     def choose_move(self, state: GameState) -> Move:
-        root = Node(state=state, parent=None, move=None)
-        size = state.board.size
-        if size == 3:
-            iter = 1500
-        elif size == 4:
-            iter = 5000
-        elif size == 5:
-            iter = 20000
-        for _ in range(iter):
-            leaf = self._select(root)
-            expanded = self._expand(leaf)
-            result = self._rollout(expanded.state)
-            self._backprop(expanded, result)
-
-        best = None
-        best_visits = -1
-        for m, ch in root.children.items():
-            if ch.visits > best_visits:
-                best_visits = ch.visits
-                best = m
+        if state.is_terminal():
+            raise ValueError("No moves")
+        self.stop_pondering()
+        start = time.perf_counter()
+        self.phases.clear()
+        visits = self._think(state, self._deadline(state))
+        best = most_visited(visits)
+        elapsed = time.perf_counter() - start
+        if self._clock_left is not None:
+            self._clock_left = max(0.0, self._clock_left - elapsed)
+        if self.stats_hook is not None:
+            self.emit_stats(
+                state,
+                elapsed,
+                iterations=self.last_iterations,
+                tree_size=self.last_tree_size,
+                max_depth=self.last_depth,
+                phases=self.phases.as_dict(),
+                root_visits=visits_record(visits),
+                pondered=self.last_ponder_iterations,
+            )
+        if self.ponder and self._root is not None:
+            self._start_pondering(self._root)
         if best is None:
             moves = state.board.available_moves()
             if not moves:
                 raise ValueError("No moves")
-            return random.choice(moves)
+            return self.rng.choice(moves)
         return best
 
-    def _select(self, node: Node) -> Node:
+    @property
+    def pondering(self) -> bool:
+        thread = self._ponder_thread
+        return thread is not None and thread.is_alive()
+
+    def _start_pondering(self, root: Node) -> None:
+        if root.state.is_terminal():
+            return
+        limit = self.ponder_iterations
+        if limit is None:
+            limit = 4 * default_iterations(root.state.board.size)
+        self.last_ponder_iterations = 0
+        self._ponder_stop.clear()
+        self._ponder_thread = threading.Thread(
+            target=self._ponder, args=(root, limit), name="mcts-ponder", daemon=True
+        )
+        self._ponder_thread.start()
+
+    def _ponder(self, root: Node, limit: int) -> None:
+        # Grows the tree below our last move while the opponent thinks; the
+        # next choose_move() stops it and _root_for() keeps the subtree of the
+        # reply. The limit bounds memory if the opponent never answers.
+        stop = self._ponder_stop
+        done = 0
+        while done < limit and not stop.is_set() and not self.cancelled:
+            path = self._select(root)
+            leaf = self._expand(path)
+            self._backprop(path, self._rollout(leaf.state))
+            done += 1
+        self.last_ponder_iterations = done
+
+    def stop_pondering(self) -> None:
+        thread = self._ponder_thread
+        if thread is None:
+            return
+        self._ponder_stop.set()
+        thread.join()
+        self._ponder_thread = None
+
+    def close(self) -> None:
+        self.stop_pondering()
+
+    def _think(self, state: GameState, deadline: Optional[float]) -> Dict[Move, int]:
+        root = self.search(state, deadline=deadline)
+        visits = root_visits(root)
+        best = most_visited(visits)
+        self._root = root.children.get(best) if self.reuse_tree and best is not None else None
+        return visits
+
+    def _select(self, node: Node) -> List[Node]:
         cur = node
-        while not cur.state.is_terminal() and cur.children:
+        path = [cur]
+        while not cur.state.is_terminal() and cur.is_fully_expanded():
+            # Values are stored from this bot's point of view; the opponent
+            # picks the child that is worst for us.
+            sign = 1.0 if cur.state.to_move == self.mark else -1.0
             best_child = None
             best_score = -10**9
-            for ch in cur.children.values():
-                score = cur.uct_score(ch, self.c)
+            for m, ch in cur.children.items():
+                if self.rave:
+                    score = cur.rave_score(m, ch, self.c, sign, self.rave_equivalence)
+                else:
+                    score = cur.uct_score(ch, self.c, sign)
                 if score > best_score:
                     best_score = score
                     best_child = ch
-            cur = best_child if best_child is not None else cur
-        return cur
+            if best_child is None:
+                break
+            cur = best_child
+            path.append(cur)
+        if self.transpositions:
+            for n in path:
+                self._touch(n)
+        return path
 
-    def _expand(self, node: Node) -> Node:
+    def _expand(self, path: List[Node]) -> Node:
+        node = path[-1]
         if node.state.is_terminal():
             return node
-        moves = node.state.board.available_moves()
-        for m in moves:
+        for m in node.candidates():
             if m not in node.children:
-                node.children[m] = Node(state=node.state.apply(m), parent=node, move=m)
-                return node.children[m]
+                child_state = node.state.apply(m)
+                child = self._table.get(child_state.key) if self.transpositions else None
+                if child is None or child.state.board != child_state.board:
+                    child = Node(state=child_state, parent=node, move=m)
+                    if self.transpositions:
+                        self._store(child)
+                node.children[m] = child
+                path.append(child)
+                return child
         return node
 
+    def _touch(self, node: Node) -> None:
+        key = node.state.key
+        if self._table.get(key) is node:
+            self._table.move_to_end(key)
+        elif key not in self._table:
+            self._store(node)
+
+    def _store(self, node: Node) -> None:
+        table = self._table
+        table[node.state.key] = node
+        while len(table) > self.table_size:
+            _, old = table.popitem(last=False)
+            # Evicted nodes keep their own statistics but drop their edges, so
+            # everything alive is either in the table or one edge away from it.
+            old.children.clear()
+
+    def _scratch(self, state: GameState) -> Playout:
+        size = state.board.size
+        k = state.config.k()
+        pl = self._playout
+        if pl is None or pl.size != size or pl.win_k != k:
+            pl = self._playout = Playout(size, k)
+        pl.load(state)
+        return pl
+
     def _rollout(self, state: GameState) -> float:
-        cur = state
-        while not cur.is_terminal():
-            moves = cur.board.available_moves()
-            cur = cur.apply(random.choice(moves))
-        return cur.reward_for(self.mark)
-
-    def _backprop(self, node: Node, reward: float) -> None:
-        cur: Optional[Node] = node
-        while cur is not None:
-            cur.visits += 1
-            cur.value_sum += reward
-            cur = cur.parent
+        winner = self.rollout_policy.rollout(self._scratch(state), self.rng)
+        if winner is None:
+            return 0.0
+        return 1.0 if winner == self.mark else -1.0
+
+    def _backprop(self, path: List[Node], reward: float) -> None:
+        for node in path:
+            node.visits += 1
+            node.value_sum += reward
+        if self.rave:
+            self._backprop_amaf(path, reward)
+
+    def _backprop_amaf(self, path: List[Node], reward: float) -> None:
+        # Every cell the side to move at a node took later in the simulation,
+        # in the tree or in the rollout, counts as if it had been played first.
+        pl = self._playout
+        cells = pl.size * pl.size
+        for node in path:
+            state = node.state
+            if state.is_terminal():
+                continue
+            board = state.board
+            later = pl.final_x if state.to_move == Mark.X else pl.final_o
+            later &= ~(board.x_bits | board.o_bits)
+            if not later:
+                continue
+            if node.amaf_visits is None:
+                node.amaf_visits = [0] * cells
+                node.amaf_sum = [0.0] * cells
+            visits = node.amaf_visits
+            sums = node.amaf_sum
+            while later:
+                low = later & -later
+                i = low.bit_length() - 1
+                visits[i] += 1
+                sums[i] += reward
+                later ^= low
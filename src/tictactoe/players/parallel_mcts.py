@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from tictactoe.core.game import GameState
+from tictactoe.core.rollout import RandomRollout, RolloutPolicy
+from tictactoe.core.types import Mark, Move
+from tictactoe.players.base import Player
+from tictactoe.players.mcts import (
+    MCTSBot,
+    default_iterations,
+    most_visited,
+    root_visits,
+    visits_record,
+)
+
+
+class _WorkerBot(MCTSBot):
+    # MCTSBot whose cancel flag and progress counter live in memory shared
+    # with the parent: the search loop polls the parent's stop flag and
+    # publishes its iteration count in its task's slot.
+    def __init__(self, stop: Any, progress: Any, mark: Mark, **kwargs: Any) -> None:
+        self._stop = stop
+        self._slots = progress
+        self.slot: Optional[int] = None
+        super().__init__(mark, **kwargs)
+
+    @property
+    def cancelled(self) -> bool:
+        return bool(self._stop.value)
+
+    @cancelled.setter
+    def cancelled(self, value: bool) -> None:
+        # Only the parent sets or clears the stop flag.
+        pass
+
+    @property
+    def progress(self) -> int:
+        return 0 if self.slot is None else self._slots[self.slot]
+
+    @progress.setter
+    def progress(self, value: int) -> None:
+        if self.slot is not None:
+            self._slots[self.slot] = value
+
+
+_worker_bot: Optional[_WorkerBot] = None
+
+
+def _init_worker(
+    mark: Mark, c: float, rollout: RolloutPolicy, rave: bool, stop: Any, progress: Any
+) -> None:
+    global _worker_bot
+    _worker_bot = _WorkerBot(
+        stop, progress, mark, c=c, reuse_tree=False, rollout=rollout, rave=rave
+    )
+
+
+def _search_worker(
+    state: GameState,
+    iterations: Optional[int],
+    time_budget: Optional[float],
+    seed: int,
+    slot: int,
+) -> Tuple[Dict[Move, int], int]:
+    bot = _worker_bot
+    bot.rng.seed(seed)
+    bot.slot = slot
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    root = bot.search(state, iterations, deadline)
+    return root_visits(root), bot.last_iterations
+
+
+class ParallelMCTSBot(Player):
+    def __init__(
+        self,
+        mark: Mark,
+        workers: int = 2,
+        iterations: Optional[int] = None,
+        c: float = 1.4,
+        seed: Optional[int] = None,
+        time_budget: Optional[float] = None,
+        rollout: Optional[RolloutPolicy] = None,
+        rave: bool = False,
+    ) -> None:
+        super().__init__(mark)
+        self.workers = max(1, workers)
+        self.iterations = iterations
+        self.time_budget = time_budget
+        self.last_iterations = 0
+        self.c = c
+        self.rng = random.Random(seed)
+        self.rollout_policy = rollout or RandomRollout()
+        self.rave = rave
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Stop flag and per-task iteration counts shared with the workers, so
+        # cancel() and search_progress() work while a search is running.
+        self._stop = multiprocessing.RawValue("b", 0)
+        self._slots = multiprocessing.RawArray("q", self.workers)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(
+                    self.mark,
+                    self.c,
+                    self.rollout_policy,
+                    self.rave,
+                    self._stop,
+                    self._slots,
+                ),
+            )
+        return self._pool
+
+    def cancel(self) -> None:
+        super().cancel()
+        self._stop.value = 1
+
+    def reset_cancel(self) -> None:
+        super().reset_cancel()
+        self._stop.value = 0
+        self._slots[:] = [0] * self.workers
+
+    def search_progress(self) -> Tuple[int, int]:
+        return sum(self._slots), self.progress_total
+
+    def search_visits(self, state: GameState) -> Dict[Move, int]:
+        total = self.iterations
+        if total is None and self.time_budget is None:
+            total = default_iterations(state.board.size)
+        share = None if total is None else -(-total // self.workers)
+        seeds = [self.rng.getrandbits(32) for _ in range(self.workers)]
+        self._slots[:] = [0] * self.workers
+        self.progress_total = 0 if share is None else share * self.workers
+        pool = self._executor()
+        futures = [
+            pool.submit(_search_worker, state, share, self.time_budget, seed, slot)
+            for slot, seed in enumerate(seeds)
+        ]
+        merged: Dict[Move, int] = {}
+        results: List[Tuple[Dict[Move, int], int]] = [f.result() for f in futures]
+        for visits, _ in results:
+            for m, n in visits.items():
+                merged[m] = merged.get(m, 0) + n
+        self.last_iterations = sum(done for _, done in results)
+        return merged
+
+    def choose_move(self, state: GameState) -> Move:
+        start = time.perf_counter()
+        visits = self.search_visits(state)
+        best = most_visited(visits)
+        if self.stats_hook is not None:
+            self.emit_stats(
+                state,
+                time.perf_counter() - start,
+                iterations=self.last_iterations,
+                workers=self.workers,
+                root_visits=visits_record(visits),
+            )
+        if best is None:
+            moves = state.board.available_moves()
+            if not moves:
+                raise ValueError("No moves")
+            return self.rng.choice(moves)
+        return best
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self) -> "ParallelMCTSBot":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
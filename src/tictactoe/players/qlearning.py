@@ -1,48 +1,53 @@
 from __future__ import annotations
 
 import random
+import time
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import List, Optional
 
+from tictactoe.core.encoding import encode_action, encode_state
 from tictactoe.core.game import GameState
 from tictactoe.core.types import Mark, Move
 from tictactoe.players.base import Player
-from tictactoe.training.serialize import load_q_table
-
-
-def _state_key(state: GameState) -> str:
-    return "|".join("".join(row) for row in state.board.as_tuple())
-
-
-def _action_key(move: Move) -> str:
-    return f"{move.row},{move.col}"
+from tictactoe.training.serialize import DenseQTable, QModel, load_q_model
 
 
 class QLearningBot(Player):
-    def __init__(self, mark: Mark, model_path: Path, eps: float = 0.05) -> None:
+    def __init__(
+        self, mark: Mark, model_path: Path, eps: float = 0.05, seed: Optional[int] = None
+    ) -> None:
         super().__init__(mark)
-        self.q: Dict[str, Dict[str, float]] = load_q_table(model_path)
+        self.q: QModel = load_q_model(model_path)
         self.eps = eps
+        self.rng = random.Random(seed)
+
+    def _values(self, state: GameState, moves: List[Move]) -> List[float]:
+        size = state.board.size
+        sid, sym = encode_state(state)
+        cells = [encode_action(m, sym, size) for m in moves]
+        if self.q.size is not None and self.q.size != size:
+            raise ValueError(f"Q-table is for {self.q.size}x{self.q.size} boards")
+        if isinstance(self.q, DenseQTable):
+            return [self.q.get(sid, c) for c in cells]
+        qs = self.q.get(sid, {})
+        return [qs.get(c, 0.0) for c in cells]
 
     def choose_move(self, state: GameState) -> Move:
-        if state.board.size != 3 or state.config.k() != 3:
-            raise ValueError("QLearningBot supports only 3x3 with k=3")
-
         moves = state.board.available_moves()
         if not moves:
             raise ValueError("No moves")
 
-        if random.random() < self.eps:
-            return random.choice(moves)
+        start = time.perf_counter()
+        if self.rng.random() < self.eps:
+            move = self.rng.choice(moves)
+            self.emit_stats(state, time.perf_counter() - start, explored=True)
+            return move
 
-        s = _state_key(state)
-        qs = self.q.get(s, {})
         best = None
         best_val = -10**9
-        for m in moves:
-            a = _action_key(m)
-            val = qs.get(a, 0.0)
+        for m, val in zip(moves, self._values(state, moves)):
             if val > best_val:
                 best_val = val
                 best = m
-        return best if best is not None else random.choice(moves)
+        self.emit_stats(state, time.perf_counter() - start, explored=False, value=best_val)
+        return best if best is not None else self.rng.choice(moves)
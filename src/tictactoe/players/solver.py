@@ -0,0 +1,389 @@
+from __future__ import annotations
+
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from tictactoe.core.board import (
+    cell_moves,
+    full_mask,
+    lines_through,
+    masks_through,
+    near_masks,
+    win_masks,
+)
+from tictactoe.core.game import GameState
+from tictactoe.core.symmetry import inverse_permutations, permutations, transform_bits
+from tictactoe.core.types import Mark, Move
+from tictactoe.players.base import Player
+
+WIN = 1_000_000
+# Scores above this are forced wins; they encode the distance to the win and
+# are stored in the table relative to the node, not the root.
+DECISIVE = WIN - 10_000
+
+# Positions with at most this many stones share table entries with their
+# rotations and reflections; deeper, the lookup would cost more than it saves.
+SYMMETRIC_PLIES = 4
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+@lru_cache(maxsize=None)
+def center_distance(size: int) -> Tuple[int, ...]:
+    # Manhattan distance of each cell to the centre, doubled to stay integral.
+    mid = size - 1
+    return tuple(abs(2 * (i // size) - mid) + abs(2 * (i % size) - mid) for i in range(size * size))
+
+
+def default_depth(size: int) -> Optional[int]:
+    if size <= 4:
+        return None
+    if size == 5:
+        return 6
+    return 4
+
+
+class _Timeout(Exception):
+    pass
+
+
+class SolverBot(Player):
+    # Negamax with alpha-beta and a transposition table keyed by the exact
+    # position. Without a depth limit the search is exhaustive (perfect play);
+    # with one, leaves are scored by counting open lines.
+    def __init__(
+        self,
+        mark: Mark,
+        max_depth: Optional[int] = None,
+        time_budget: Optional[float] = None,
+        table_size: int = 2_000_000,
+    ) -> None:
+        super().__init__(mark)
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+        self.table_size = table_size
+        self.table: Dict[int, Tuple[int, int, int, int]] = {}
+        self._config: Optional[Tuple[int, int, Optional[int]]] = None
+        self._deadline: Optional[float] = None
+        self.nodes = 0
+        self.last_depth = 0
+        self.last_score = 0
+
+    def reset(self) -> None:
+        self.table.clear()
+
+    def _prepare(self, state: GameState) -> None:
+        size = state.board.size
+        k = state.config.k()
+        config = (size, k, state.config.radius)
+        if self._config != config:
+            self.table.clear()
+            self._config = config
+        self._size = size
+        self._cells = size * size
+        self._full = full_mask(size)
+        self._masks = win_masks(size, k)
+        self._through = masks_through(size, k)
+        self._dist = center_distance(size)
+        self._k = k
+        self._weights = [0] + [10 ** (n - 1) for n in range(1, k + 1)]
+        # Sparse mode (GameConfig.radius): search only cells near the stones
+        # and scan only lines that hold a stone, line j being bit j of the
+        # `lines` mask. Both masks grow with each move; in dense mode they
+        # stay full.
+        radius = state.config.radius
+        self._sparse = radius is not None
+        self._all_lines = (1 << len(self._masks)) - 1
+        if self._sparse:
+            self._near = near_masks(size, radius)
+            self._line_bits = tuple(
+                sum(1 << j for j in through) for through in lines_through(size, k)
+            )
+        else:
+            self._near = self._line_bits = (0,) * self._cells
+        self._perms = permutations(size)
+        self._inverse = inverse_permutations(size)
+
+    def _threats(self, bits: int, other: int) -> int:
+        # Empty cells that would complete a line for `bits`.
+        need = self._k - 1
+        out = 0
+        for m in self._masks:
+            if not m & other and (m & bits).bit_count() == need:
+                out |= m & ~bits
+        return out
+
+    def _active(self, lines: int) -> Sequence[int]:
+        if not self._sparse:
+            return self._masks
+        masks = self._masks
+        out = []
+        while lines:
+            low = lines & -lines
+            out.append(masks[low.bit_length() - 1])
+            lines ^= low
+        return out
+
+    def _scan(
+        self, me: int, opp: int, empties: int, masks: Sequence[int], untouched: bool
+    ) -> Tuple[int, int, bool]:
+        # Winning cells for each side, and whether either side can still
+        # complete some line with the moves it has left. Lines left out of
+        # `masks` are empty; `untouched` says whether there are any.
+        k = self._k
+        my_left = k - (empties + 1) // 2
+        their_left = k - empties // 2
+        mine = theirs = 0
+        live = untouched and my_left <= 0
+        for m in masks:
+            a = m & me
+            b = m & opp
+            if not b:
+                n = a.bit_count()
+                if n >= my_left:
+                    live = True
+                    if n == k - 1:
+                        mine |= m & ~me
+            elif not a:
+                n = b.bit_count()
+                if n >= their_left:
+                    live = True
+                    if n == k - 1:
+                        theirs |= m & ~opp
+        return mine, theirs, live
+
+    def _canonical_key(self, me: int, opp: int, key: int) -> Tuple[int, int]:
+        size = self._size
+        cells = self._cells
+        best = key
+        best_sym = 0
+        for sym in range(1, 8):
+            cand = transform_bits(me, sym, size) << cells | transform_bits(opp, sym, size)
+            if cand < best:
+                best = cand
+                best_sym = sym
+        return best, best_sym
+
+    def _evaluate(self, me: int, opp: int, masks: Sequence[int]) -> int:
+        weights = self._weights
+        score = 0
+        for m in masks:
+            mine = m & me
+            theirs = m & opp
+            if not theirs:
+                score += weights[mine.bit_count()]
+            elif not mine:
+                score -= weights[theirs.bit_count()]
+        return score
+
+    def _candidates(self, me: int, opp: int, near: int, threats: int, first: int) -> List[int]:
+        if threats:
+            return [threats.bit_length() - 1]
+        free = self._full & ~(me | opp)
+        # Sparse mode only considers cells near the stones, see GameState.
+        cand = near & free or free
+        through = self._through
+        dist = self._dist
+        scored = []
+        while cand:
+            low = cand & -cand
+            c = low.bit_length() - 1
+            cand ^= low
+            # Lines through the cell that are still open to either side,
+            # weighted by the stones already in them.
+            s = 0
+            for m in through[c]:
+                a = m & me
+                b = m & opp
+                if not b:
+                    s += 1 + 2 * a.bit_count()
+                elif not a:
+                    s += 1 + 2 * b.bit_count()
+            # Ties go to the cell nearest the centre.
+            scored.append((-s, dist[c], c))
+        scored.sort()
+        cells = [c for _, _, c in scored]
+        if first >= 0 and first in cells:
+            cells.remove(first)
+            cells.insert(0, first)
+        return cells
+
+    def _negamax(
+        self,
+        me: int,
+        opp: int,
+        near: int,
+        lines: int,
+        depth: int,
+        alpha: int,
+        beta: int,
+        ply: int,
+    ) -> int:
+        self.nodes += 1
+        if not self.nodes & 1023:
+            self.progress = self.nodes
+            if self.cancelled:
+                raise _Timeout
+            if self._deadline is not None and time.perf_counter() >= self._deadline:
+                raise _Timeout
+        occupied = me | opp
+        empties = self._cells - occupied.bit_count()
+        masks = self._active(lines)
+        mine, threats, live = self._scan(me, opp, empties, masks, lines != self._all_lines)
+        if mine:
+            return WIN - ply - 1
+        if not live:
+            return 0
+        if threats & (threats - 1):
+            return -(WIN - ply - 2)
+
+        depth = min(depth, empties)
+        sym = 0
+        key = me << self._cells | opp
+        if self._cells - empties <= SYMMETRIC_PLIES:
+            key, sym = self._canonical_key(me, opp, key)
+        entry = self.table.get(key)
+        first = -1
+        if entry is not None:
+            d, flag, v, first = entry
+            if first >= 0:
+                first = self._inverse[sym][first]
+            if d >= depth:
+                if v > DECISIVE:
+                    v -= ply
+                elif v < -DECISIVE:
+                    v += ply
+                if flag == EXACT:
+                    return v
+                if flag == LOWER and v >= beta:
+                    return v
+                if flag == UPPER and v <= alpha:
+                    return v
+        if depth == 0:
+            return self._evaluate(me, opp, masks)
+
+        alpha0 = alpha
+        best = -WIN
+        best_cell = -1
+        grow = self._near
+        line_bits = self._line_bits
+        for c in self._candidates(me, opp, near, threats, first):
+            v = -self._negamax(
+                opp,
+                me | 1 << c,
+                near | grow[c],
+                lines | line_bits[c],
+                depth - 1,
+                -beta,
+                -alpha,
+                ply + 1,
+            )
+            if v > best:
+                best = v
+                best_cell = c
+                if v > alpha:
+                    alpha = v
+                    if alpha >= beta:
+                        break
+
+        flag = UPPER if best <= alpha0 else LOWER if best >= beta else EXACT
+        stored = best
+        if best > DECISIVE:
+            stored += ply
+        elif best < -DECISIVE:
+            stored -= ply
+        if len(self.table) >= self.table_size:
+            self.table.clear()
+        if best_cell >= 0:
+            best_cell = self._perms[sym][best_cell]
+        self.table[key] = (depth, flag, stored, best_cell)
+        return best
+
+    def _search_root(
+        self, me: int, opp: int, near: int, lines: int, depth: int, first: int
+    ) -> Tuple[int, int]:
+        alpha = -WIN
+        best_cell = -1
+        threats = self._threats(opp, me)
+        grow = self._near
+        line_bits = self._line_bits
+        for c in self._candidates(me, opp, near, threats, first):
+            v = -self._negamax(
+                opp, me | 1 << c, near | grow[c], lines | line_bits[c], depth - 1, -WIN, -alpha, 1
+            )
+            if best_cell < 0 or v > alpha:
+                alpha = v
+                best_cell = c
+        return alpha, best_cell
+
+    def choose_move(self, state: GameState) -> Move:
+        board = state.board
+        moves = cell_moves(board.size)
+        if board.is_full():
+            raise ValueError("No moves")
+        self._prepare(state)
+        me, opp = board.x_bits, board.o_bits
+        if state.to_move == Mark.O:
+            me, opp = opp, me
+
+        start = time.perf_counter()
+        self.nodes = 0
+        self.last_depth = 0
+        win = self._threats(me, opp)
+        if win:
+            self.last_score = WIN - 1
+            self._report(state, start)
+            return moves[win.bit_length() - 1]
+
+        empties = self._cells - board.count()
+        max_depth = self.max_depth
+        if max_depth is None and self.time_budget is None:
+            max_depth = default_depth(board.size)
+        limit = empties if max_depth is None else min(max_depth, empties)
+        self._deadline = None
+        if self.time_budget is not None:
+            self._deadline = time.perf_counter() + self.time_budget
+
+        near = self._full
+        lines = self._all_lines
+        if self._sparse:
+            near = state.candidate_bits()
+            lines = 0
+            stones = me | opp
+            while stones:
+                low = stones & -stones
+                lines |= self._line_bits[low.bit_length() - 1]
+                stones ^= low
+        best_cell = -1
+        # Iterative deepening only pays off when the search may be cut short;
+        # shallow heuristic entries just mislead the ordering of a full solve.
+        first = 1 if self._deadline is not None else limit
+        for depth in range(first, limit + 1):
+            try:
+                score, cell = self._search_root(me, opp, near, lines, depth, best_cell)
+            except _Timeout:
+                break
+            best_cell = cell
+            self.last_depth = depth
+            self.last_score = score
+            if abs(score) > DECISIVE:
+                break
+        self._deadline = None
+        if best_cell < 0:
+            best_cell = self._candidates(me, opp, near, self._threats(opp, me), -1)[0]
+        self._report(state, start)
+        return moves[best_cell]
+
+    def _report(self, state: GameState, start: float) -> None:
+        if self.stats_hook is not None:
+            self.emit_stats(
+                state,
+                time.perf_counter() - start,
+                nodes=self.nodes,
+                depth=self.last_depth,
+                score=self.last_score,
+                table_size=len(self.table),
+            )
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, TextIO
+
+StatsHook = Callable[[Dict[str, Any]], None]
+
+
+class PhaseTimer:
+    # Accumulated seconds and call counts per named phase. Callers only time
+    # phases when a hook is attached, so the disabled path costs nothing.
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, phase: str, seconds: float, n: int = 1) -> None:
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+        self.counts[phase] = self.counts.get(phase, 0) + n
+
+    def as_dict(self) -> Dict[str, float]:
+        return {phase: round(s, 6) for phase, s in self.seconds.items()}
+
+    def clear(self) -> None:
+        self.seconds.clear()
+        self.counts.clear()
+
+
+class JsonLinesSink:
+    # Stats hook that writes one JSON object per line; "-" means stdout.
+    def __init__(self, target: str) -> None:
+        self._own = target != "-"
+        self._f: Optional[TextIO] = sys.stdout
+        if self._own:
+            path = Path(target)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._f = path.open("a", encoding="utf-8")
+
+    def __call__(self, record: Dict[str, Any]) -> None:
+        if self._f is not None:
+            self._f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self._f.flush()
+
+    def close(self) -> None:
+        if self._own and self._f is not None:
+            self._f.close()
+        self._f = None
+
+    def __enter__(self) -> "JsonLinesSink":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from tictactoe.core.board import win_masks
+from tictactoe.core.symmetry import inverse_permutations, permutations
+from tictactoe.training.episode_log import EpisodeLog
+from tictactoe.training.serialize import MAX_DENSE_STATES, QTable
+from tictactoe.training.train_q import QParams
+
+
+class BatchedQTrainer:
+    # Self-play Q-learning over a batch of games at once. Boards are rows of
+    # base-3 digits (0 empty, 1 X, 2 O), Q is a dense array indexed by the
+    # canonical base-3 state id and the canonical cell index.
+    def __init__(
+        self,
+        params: QParams,
+        size: int = 3,
+        win_k: int = 3,
+        batch_size: int = 1024,
+        seed: Optional[int] = None,
+    ) -> None:
+        cells = size * size
+        if 3**cells > MAX_DENSE_STATES:
+            raise ValueError("Dense Q array is too large for this board size")
+        self.params = params
+        self.size = size
+        self.win_k = win_k
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+
+        n_states = 3**cells
+        self.pow3 = 3 ** np.arange(cells, dtype=np.int64)
+        digits = (np.arange(n_states, dtype=np.int64)[:, None] // self.pow3) % 3
+        self.digits = digits.astype(np.int8)
+        self.perms = np.array(permutations(size), dtype=np.int64)
+
+        # Same choice as core.symmetry.canonical: the image with the smallest
+        # (x_bits, o_bits), first symmetry on ties.
+        bit = 1 << np.arange(cells, dtype=np.int64)
+        order = np.empty((8, n_states), dtype=np.int64)
+        images = np.empty((8, n_states), dtype=np.int64)
+        for sym, inv in enumerate(inverse_permutations(size)):
+            img = digits[:, list(inv)]
+            x = ((img == 1) * bit).sum(axis=1)
+            o = ((img == 2) * bit).sum(axis=1)
+            order[sym] = (x << cells) | o
+            images[sym] = img @ self.pow3
+        self.canon_sym = order.argmin(axis=0)
+        self.canon_id = images[self.canon_sym, np.arange(n_states)]
+
+        lines = []
+        for mask in win_masks(size, win_k):
+            lines.append([i for i in range(cells) if mask >> i & 1])
+        self.lines = np.array(lines, dtype=np.int64)
+
+        self.q = np.zeros((n_states, cells), dtype=np.float64)
+        self.seen = np.zeros((n_states, cells), dtype=bool)
+
+    def _play_batch(self, n: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        cells = self.size * self.size
+        boards = np.zeros((n, cells), dtype=np.int8)
+        active = np.ones(n, dtype=bool)
+        winner = np.zeros(n, dtype=np.int8)
+        hist_s: List[np.ndarray] = []
+        hist_a: List[np.ndarray] = []
+        hist_game: List[np.ndarray] = []
+        hist_mover: List[np.ndarray] = []
+        rows = np.arange(n)
+
+        for ply in range(cells):
+            idx = rows[active]
+            if idx.size == 0:
+                break
+            mover = 1 if ply % 2 == 0 else 2
+            b = boards[idx]
+            sid = b.astype(np.int64) @ self.pow3
+            cid = self.canon_id[sid]
+            perm = self.perms[self.canon_sym[sid]]
+            q_real = np.take_along_axis(self.q[cid], perm, axis=1)
+            legal = b == 0
+            scores = np.where(legal, q_real, -np.inf)
+            explore = self.rng.random(idx.size) < self.params.eps
+            if explore.any():
+                noise = self.rng.random((int(explore.sum()), cells))
+                scores[explore] = np.where(legal[explore], noise, -1.0)
+            action = scores.argmax(axis=1)
+
+            hist_s.append(cid)
+            hist_a.append(perm[np.arange(idx.size), action])
+            hist_game.append(idx)
+            hist_mover.append(np.full(idx.size, mover, dtype=np.int8))
+
+            boards[idx, action] = mover
+            won = (boards[idx][:, self.lines] == mover).all(axis=2).any(axis=1)
+            winner[idx[won]] = mover
+            full = (boards[idx] != 0).all(axis=1)
+            active[idx[won | full]] = False
+
+        s = np.concatenate(hist_s)
+        a = np.concatenate(hist_a)
+        game_winner = winner[np.concatenate(hist_game)]
+        who = np.concatenate(hist_mover)
+        reward = np.where(game_winner == 0, 0.0, np.where(game_winner == who, 1.0, -1.0))
+        return s, a, reward, winner
+
+    def _update(self, s: np.ndarray, a: np.ndarray, reward: np.ndarray) -> None:
+        cells = self.size * self.size
+        flat = s * cells + a
+        size = self.q.size
+        counts = np.bincount(flat, minlength=size)
+        sums = np.bincount(flat, weights=reward, minlength=size)
+        touched = np.nonzero(counts)[0]
+        m = counts[touched]
+        target = sums[touched] / m
+        q = self.q.reshape(-1)
+        old = q[touched]
+        # m sequential updates towards the mean target, in closed form, so a
+        # popular (state, action) pair does not overshoot with large batches.
+        step = 1.0 - (1.0 - self.params.alpha) ** m
+        q[touched] = old + step * (target - old)
+        self.seen.reshape(-1)[touched] = True
+
+    def train_selfplay(self, episodes: int, log_csv: Optional[Path] = None) -> QTable:
+        labels = ("DRAW", "X", "O")
+        done = 0
+        with EpisodeLog(log_csv) as log:
+            while done < episodes:
+                n = min(self.batch_size, episodes - done)
+                s, a, reward, winner = self._play_batch(n)
+                self._update(s, a, reward)
+                if log_csv is not None:
+                    for i, w in enumerate(winner.tolist()):
+                        log.write_label(done + i, labels[w])
+                done += n
+        return self.to_table()
+
+    def to_table(self) -> QTable:
+        table: QTable = {}
+        for sid in np.nonzero(self.seen.any(axis=1))[0].tolist():
+            actions = np.nonzero(self.seen[sid])[0].tolist()
+            table[sid] = {a: float(self.q[sid, a]) for a in actions}
+        return table
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import argparse
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from tictactoe.core.board import Board, cell_moves
+from tictactoe.core.encoding import encode_state, num_states, state_id
+from tictactoe.core.game import GameState
+from tictactoe.core.symmetry import canonical, inverse_permutations
+from tictactoe.core.types import GameConfig, Mark, Move
+from tictactoe.players.solver import SolverBot, default_depth
+from tictactoe.training.serialize import atomic_write_bytes
+
+# File layout: 16-byte header, then the sorted uint64 ids of the canonical
+# positions and one uint8 canonical cell per position, little-endian.
+_MAGIC = b"TTB1"
+_HEADER = struct.Struct("<4sHHQ")
+
+
+class OpeningBook:
+    # Best move per canonical position (see core.encoding), mapped back to the
+    # real board through the symmetry found by encode_state.
+    def __init__(self, size: int, win_k: int, moves: Dict[int, int]) -> None:
+        self.size = size
+        self.win_k = win_k
+        self.moves = moves
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def covers(self, state: GameState) -> bool:
+        return state.board.size == self.size and state.config.k() == self.win_k
+
+    def lookup(self, state: GameState) -> Optional[Move]:
+        sid, sym = encode_state(state)
+        cell = self.moves.get(sid)
+        if cell is None:
+            return None
+        return cell_moves(self.size)[inverse_permutations(self.size)[sym][cell]]
+
+
+def default_book_path(size: int = 3, win_k: int = 3) -> Path:
+    return Path(f"data/book_{size}x{size}_k{win_k}.bin")
+
+
+def default_book_depth(size: int) -> int:
+    if size == 3:
+        return 9
+    if size == 4:
+        return 4
+    return 2
+
+
+def save_book(path: Path, book: OpeningBook) -> None:
+    keys = array("Q", sorted(book.moves))
+    cells = array("B", [book.moves[k] for k in keys])
+    if sys.byteorder != "little":
+        keys.byteswap()
+    header = _HEADER.pack(_MAGIC, book.size, book.win_k, len(keys))
+    atomic_write_bytes(path, header + keys.tobytes() + cells.tobytes())
+
+
+def load_book(path: Path) -> OpeningBook:
+    data = path.read_bytes()
+    magic, size, win_k, count = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError(f"Not an opening book: {path}")
+    keys = array("Q")
+    keys.frombytes(data[_HEADER.size:_HEADER.size + 8 * count])
+    if sys.byteorder != "little":
+        keys.byteswap()
+    cells = array("B")
+    cells.frombytes(data[_HEADER.size + 8 * count:_HEADER.size + 9 * count])
+    return OpeningBook(size, win_k, dict(zip(keys, cells)))
+
+
+def _layers(size: int, win_k: int, last: int) -> List[List[Board]]:
+    # Non-terminal canonical positions reachable from the empty board,
+    # grouped by the number of stones, up to `last` stones.
+    cfg = GameConfig(size=size, win_k=win_k)
+    layer = [Board.empty(size)]
+    layers = [layer]
+    for n in range(last):
+        mark = Mark.X if n % 2 == 0 else Mark.O
+        seen: Dict[int, Board] = {}
+        for board in layer:
+            state = GameState(board=board, to_move=mark, config=cfg)
+            for move in board.available_moves():
+                nxt = state.apply(move)
+                if nxt.is_terminal():
+                    continue
+                canon, _ = canonical(nxt.board)
+                seen.setdefault(state_id(canon), canon)
+        layer = list(seen.values())
+        layers.append(layer)
+    return layers
+
+
+def build_book(
+    size: int,
+    win_k: int,
+    depth: int,
+    endgame: int = 0,
+    solver_depth: Optional[int] = None,
+) -> OpeningBook:
+    # Openings: every position with at most `depth` stones. Endgames: every
+    # position with at most `endgame` empty cells; reaching them means
+    # enumerating the whole game, so this is only practical on small boards.
+    # Position ids are stored as uint64, which covers boards up to 6x6.
+    if num_states(size) > 2**64:
+        raise ValueError("Opening books support boards up to 6x6")
+    cells = size * size
+    last = cells - 1 if endgame > 0 else min(depth, cells - 1)
+    cfg = GameConfig(size=size, win_k=win_k)
+    if solver_depth is None:
+        solver_depth = default_depth(size)
+    solvers = {m: SolverBot(m, max_depth=solver_depth) for m in (Mark.X, Mark.O)}
+    moves: Dict[int, int] = {}
+    for n, layer in enumerate(_layers(size, win_k, last)):
+        if n > depth and cells - n > endgame:
+            continue
+        mark = Mark.X if n % 2 == 0 else Mark.O
+        for board in layer:
+            state = GameState(board=board, to_move=mark, config=cfg)
+            move = solvers[mark].choose_move(state)
+            moves[state_id(board)] = board.index(move)
+    return OpeningBook(size, win_k, moves)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="tictactoe.training.book")
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--k", type=int, default=0)
+    parser.add_argument("--depth", type=int, default=None)
+    parser.add_argument("--endgame", type=int, default=0)
+    parser.add_argument("--solver-depth", type=int, default=None)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    win_k = args.size if args.k == 0 else args.k
+    depth = default_book_depth(args.size) if args.depth is None else args.depth
+    out = args.out or default_book_path(args.size, win_k)
+    start = time.perf_counter()
+    book = build_book(args.size, win_k, depth, args.endgame, args.solver_depth)
+    save_book(out, book)
+    print(f"{len(book)} positions in {time.perf_counter() - start:.1f}s")
+    print(f"Saved: {out}")
+
+
+if __name__ == "__main__":
+    main()
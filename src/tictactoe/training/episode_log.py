@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import csv
+import os
+from pathlib import Path
+from typing import Optional
+
+from tictactoe.core.types import Mark
+
+_HEADER = ["episode", "result"]
+
+
+def _truncate(path: Path, episodes: int) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with path.open("r", newline="", encoding="utf-8") as src, tmp.open(
+        "w", newline="", encoding="utf-8"
+    ) as dst:
+        for i, line in enumerate(src):
+            if i > episodes:
+                break
+            dst.write(line)
+    os.replace(tmp, path)
+
+
+class EpisodeLog:
+    # Streams "episode,result" rows through a buffered file instead of
+    # keeping them in memory. Resuming at episode N keeps only the first N
+    # rows of an existing log, so it matches the checkpoint it resumes from.
+    def __init__(self, path: Optional[Path], start: int = 0, buffering: int = 1 << 16) -> None:
+        self.path = path
+        self._f = None
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if start > 0 and path.exists():
+            _truncate(path, start)
+            self._f = path.open("a", newline="", encoding="utf-8", buffering=buffering)
+            self._w = csv.writer(self._f)
+        else:
+            self._f = path.open("w", newline="", encoding="utf-8", buffering=buffering)
+            self._w = csv.writer(self._f)
+            self._w.writerow(_HEADER)
+
+    def write(self, episode: int, winner: Optional[Mark]) -> None:
+        if self._f is not None:
+            self._w.writerow([episode, winner.value if winner else "DRAW"])
+
+    def write_label(self, episode: int, label: str) -> None:
+        if self._f is not None:
+            self._w.writerow([episode, label])
+
+    def flush(self) -> None:
+        if self._f is not None:
+            self._f.flush()
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def __enter__(self) -> "EpisodeLog":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
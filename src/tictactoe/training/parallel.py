@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import random
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from tictactoe.training.episode_log import EpisodeLog
+from tictactoe.training.serialize import QTable
+from tictactoe.training.train_q import QParams, QTrainer
+
+
+class _ShardTrainer(QTrainer):
+    # QTrainer that also records the entries it writes, so a shard sends back
+    # only what it changed.
+    def __init__(self, params: QParams, size: int, win_k: int) -> None:
+        super().__init__(params, size=size, win_k=win_k)
+        self.changed: QTable = {}
+
+    def _set(self, s: int, a: int, v: float) -> None:
+        super()._set(s, a, v)
+        self.changed.setdefault(s, {})[a] = v
+
+
+_shard: Optional[_ShardTrainer] = None
+
+
+def _init_shard(q: QTable, params: QParams, size: int, win_k: int) -> None:
+    # Each worker process gets the starting table once and keeps its own copy.
+    global _shard
+    _shard = _ShardTrainer(params, size, win_k)
+    _shard.q = q
+
+
+def _train_shard(update: QTable, episodes: int, seed: int) -> Tuple[QTable, List[str], float]:
+    # Catch up with the merged entries of the previous rounds, train, and
+    # return the entries this round changed.
+    trainer = _shard
+    for s, qs in update.items():
+        trainer.q.setdefault(s, {}).update(qs)
+    trainer.rng.seed(seed)
+    trainer.changed = {}
+    start = time.perf_counter()
+    results = []
+    for _ in range(episodes):
+        winner = trainer.play_episode()
+        results.append(winner.value if winner else "DRAW")
+    return trainer.changed, results, time.perf_counter() - start
+
+
+def merge_q_tables(base: QTable, tables: List[QTable]) -> QTable:
+    # Model averaging: an entry a worker never touched keeps its base value
+    # (0.0 if new) in that worker's copy.
+    merged: QTable = {}
+    n = len(tables)
+    states = set(base)
+    for t in tables:
+        states.update(t)
+    for s in states:
+        base_qs = base.get(s, {})
+        actions = set(base_qs)
+        for t in tables:
+            actions.update(t.get(s, {}))
+        out = {}
+        for a in actions:
+            default = base_qs.get(a, 0.0)
+            out[a] = sum(t.get(s, {}).get(a, default) for t in tables) / n
+        merged[s] = out
+    return merged
+
+
+def merge_q_deltas(base: QTable, deltas: List[QTable]) -> QTable:
+    # merge_q_tables restricted to the entries some worker changed: `deltas`
+    # hold only those, and a worker that left an entry alone counts with its
+    # base value.
+    merged: QTable = {}
+    n = len(deltas)
+    states = set()
+    for d in deltas:
+        states.update(d)
+    for s in states:
+        base_qs = base.get(s, {})
+        actions = set()
+        for d in deltas:
+            actions.update(d.get(s, {}))
+        out = {}
+        for a in actions:
+            default = base_qs.get(a, 0.0)
+            out[a] = sum(d.get(s, {}).get(a, default) for d in deltas) / n
+        merged[s] = out
+    return merged
+
+
+class ParallelQTrainer:
+    def __init__(
+        self,
+        params: QParams,
+        workers: int = 2,
+        sync_every: int = 2000,
+        seed: Optional[int] = None,
+        size: int = 3,
+        win_k: int = 3,
+    ) -> None:
+        self.params = params
+        self.size = size
+        self.win_k = win_k
+        self.workers = max(1, workers)
+        self.sync_every = max(1, sync_every)
+        self.rng = random.Random(seed)
+        self.q: QTable = {}
+        self.worker_rates: List[float] = [0.0] * self.workers
+
+    def train_selfplay(self, episodes: int, log_csv: Optional[Path] = None) -> QTable:
+        played = [0] * self.workers
+        busy = [0.0] * self.workers
+        done = 0
+        logged = 0
+        # One single-process pool per worker, so each keeps its own copy of
+        # the table across rounds. The table is sent once at start-up; after
+        # that workers get the merged entries they have not seen yet and send
+        # back only the entries they changed.
+        pools = [
+            ProcessPoolExecutor(
+                max_workers=1,
+                initializer=_init_shard,
+                initargs=(self.q, self.params, self.size, self.win_k),
+            )
+            for _ in range(self.workers)
+        ]
+        pending: List[QTable] = [{} for _ in range(self.workers)]
+        try:
+            with EpisodeLog(log_csv) as log:
+                while done < episodes:
+                    batch = min(self.sync_every * self.workers, episodes - done)
+                    shares = [batch // self.workers] * self.workers
+                    for i in range(batch % self.workers):
+                        shares[i] += 1
+                    futures: Dict[int, Future] = {}
+                    for i, n in enumerate(shares):
+                        if n > 0:
+                            futures[i] = pools[i].submit(
+                                _train_shard, pending[i], n, self.rng.getrandbits(32)
+                            )
+                            pending[i] = {}
+                    deltas = []
+                    for i, f in futures.items():
+                        changed, results, elapsed = f.result()
+                        deltas.append(changed)
+                        played[i] += len(results)
+                        busy[i] += elapsed
+                        for r in results:
+                            log.write_label(logged, r)
+                            logged += 1
+                    merged = merge_q_deltas(self.q, deltas)
+                    for s, qs in merged.items():
+                        self.q.setdefault(s, {}).update(qs)
+                    for update in pending:
+                        for s, qs in merged.items():
+                            update.setdefault(s, {}).update(qs)
+                    done += batch
+        finally:
+            for pool in pools:
+                pool.shutdown()
+
+        self.worker_rates = [p / t if t > 0 else 0.0 for p, t in zip(played, busy)]
+        return self.q
@@ -1,16 +1,251 @@
 from __future__ import annotations
 
+import argparse
 import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, Optional, Tuple, Union
 
+from tictactoe.core.encoding import num_states
 
-def load_q_table(path: Path) -> Dict[str, Dict[str, float]]:
+# Binary layout: 16-byte header, then float32[num_states(size)][size * size]
+# in little-endian order, indexed by base-3 state id and flat cell index.
+# NaN marks entries that are absent from the JSON table.
+_MAGIC = b"TTQ1"
+_HEADER = struct.Struct("<4sHHQ")
+
+# Largest state count a dense Q array (binary file or batched trainer) may
+# cover; 3x3 fits easily, 4x4 would need 3**16 * 16 floats (about 2.75 GB).
+MAX_DENSE_STATES = 3**12
+
+# In memory, Q-tables are keyed by the base-3 id of the canonical board and
+# the flat cell index in the canonical frame (see core.encoding). JSON files
+# keep the readable "X.O|...|..." / "r,c" keys.
+QTable = Dict[int, Dict[int, float]]
+
+
+def default_model_path(size: int = 3, win_k: int = 3) -> Path:
+    if size == 3 and win_k == 3:
+        return Path("data/q_table.json")
+    return Path(f"data/q_table_{size}x{size}_k{win_k}.json")
+
+
+_TO_DIGITS = str.maketrans(".XO", "012")
+_FROM_DIGITS = ".XO"
+
+
+def _id_from_key(key: str) -> int:
+    # Row-major board string, cell 0 first, is the base-3 id written
+    # least-significant digit first.
+    return int(key.replace("|", "")[::-1].translate(_TO_DIGITS), 3)
+
+
+def _key_from_id(sid: int, size: int) -> str:
+    chars = []
+    for _ in range(size * size):
+        sid, digit = divmod(sid, 3)
+        chars.append(_FROM_DIGITS[digit])
+    return "|".join("".join(chars[r * size:(r + 1) * size]) for r in range(size))
+
+
+def _size_from_key(key: str) -> int:
+    return key.index("|") if "|" in key else len(key)
+
+
+def q_from_json(data: Dict[str, Dict[str, float]]) -> QTable:
+    q: QTable = {}
+    for key, qs in data.items():
+        n = _size_from_key(key)
+        row = q[_id_from_key(key)] = {}
+        for action, v in qs.items():
+            r, c = action.split(",")
+            row[int(r) * n + int(c)] = v
+    return q
+
+
+def q_to_json(q: QTable, size: int) -> Dict[str, Dict[str, float]]:
+    return {
+        _key_from_id(sid, size): {
+            f"{cell // size},{cell % size}": v for cell, v in sorted(qs.items())
+        }
+        for sid, qs in q.items()
+    }
+
+
+def load_q_table(path: Path) -> QTable:
     if not path.exists():
         return {}
-    return json.loads(path.read_text(encoding="utf-8"))
+    return q_from_json(json.loads(path.read_text(encoding="utf-8")))
 
 
-def save_q_table(path: Path, q: Dict[str, Dict[str, float]]) -> None:
+def atomic_write_bytes(path: Path, data: bytes) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(q, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def save_q_table(path: Path, q: QTable, size: int = 3) -> None:
+    text = json.dumps(q_to_json(q, size), ensure_ascii=False, indent=2)
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def save_checkpoint(path: Path, episode: int, q: QTable, size: int, rng_state: Any) -> None:
+    version, internal, gauss = rng_state
+    data = {
+        "episode": episode,
+        "rng": [version, list(internal), gauss],
+        "q": q_to_json(q, size),
+    }
+    atomic_write_bytes(path, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+
+def load_checkpoint(path: Path) -> Tuple[int, QTable, Any]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    version, internal, gauss = data["rng"]
+    return data["episode"], q_from_json(data["q"]), (version, tuple(internal), gauss)
+
+
+class DenseQTable:
+    def __init__(self, size: int, values: memoryview, mm: Optional[mmap.mmap] = None) -> None:
+        self.size = size
+        self.cells = size * size
+        self.values = values
+        self._mm = mm
+
+    def get(self, sid: int, cell: int, default: float = 0.0) -> float:
+        v = self.values[sid * self.cells + cell]
+        return default if v != v else v
+
+    def row(self, sid: int) -> memoryview:
+        return self.values[sid * self.cells:(sid + 1) * self.cells]
+
+    def to_dict(self) -> QTable:
+        q: QTable = {}
+        for sid in range(num_states(self.size)):
+            qs = {cell: v for cell, v in enumerate(self.row(sid)) if v == v}
+            if qs:
+                q[sid] = qs
+        return q
+
+    def close(self) -> None:
+        self.values.release()
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+def save_q_table_bin(path: Path, q: QTable, size: int = 3) -> None:
+    if num_states(size) > MAX_DENSE_STATES:
+        raise ValueError(f"Binary Q-tables are limited to boards up to 3x3, got {size}x{size}")
+    cells = size * size
+    values = array("f", [float("nan")]) * (num_states(size) * cells)
+    for sid, qs in q.items():
+        base = sid * cells
+        for cell, v in qs.items():
+            values[base + cell] = v
+    if sys.byteorder != "little":
+        values.byteswap()
+    atomic_write_bytes(path, _HEADER.pack(_MAGIC, 1, size, len(values)) + values.tobytes())
+
+
+def load_q_table_bin(path: Path) -> DenseQTable:
+    if sys.byteorder != "little":
+        raise ValueError("Binary Q-tables are little-endian only")
+    with path.open("rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, size, count = _HEADER.unpack_from(mm)
+    if magic != _MAGIC or version != 1 or count != num_states(size) * size * size:
+        mm.close()
+        raise ValueError(f"Not a binary Q-table: {path}")
+    return DenseQTable(size, memoryview(mm)[_HEADER.size:].cast("f"), mm)
+
+
+class SparseQTable(Dict[int, Dict[int, float]]):
+    # A Q-table read from JSON, with the board size its keys were written for
+    # (None for an empty file).
+    def __init__(self, q: QTable, size: Optional[int]) -> None:
+        super().__init__(q)
+        self.size = size
+
+
+def load_sparse_q_table(path: Path) -> SparseQTable:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    size = _size_from_key(next(iter(data))) if data else None
+    return SparseQTable(q_from_json(data), size)
+
+
+QModel = Union[SparseQTable, DenseQTable]
+
+MODEL_CACHE_SIZE = 8
+_model_cache: "OrderedDict[Path, Tuple[Tuple[int, int], QModel]]" = OrderedDict()
+_model_lock = threading.Lock()
+
+
+def load_q_model(path: Path) -> QModel:
+    # Process-wide cache keyed by resolved path and (mtime, size): bots that
+    # use the same file share one read-only table, and a changed file is
+    # reloaded on the next lookup. Unlike load_q_table, which trainers use to
+    # start from scratch, a missing model is an error here: an empty table
+    # would quietly play the first free cell.
+    key = path.resolve()
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No Q model at {path}") from None
+    stamp = (st.st_mtime_ns, st.st_size)
+
+    with _model_lock:
+        hit = _model_cache.get(key)
+        if hit is not None and hit[0] == stamp:
+            _model_cache.move_to_end(key)
+            return hit[1]
+
+    model: QModel
+    if path.suffix == ".bin":
+        model = load_q_table_bin(path)
+    else:
+        model = load_sparse_q_table(path)
+
+    with _model_lock:
+        _model_cache[key] = (stamp, model)
+        _model_cache.move_to_end(key)
+        while len(_model_cache) > MODEL_CACHE_SIZE:
+            _model_cache.popitem(last=False)
+    return model
+
+
+def clear_model_cache() -> None:
+    with _model_lock:
+        _model_cache.clear()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="tictactoe.training.serialize")
+    parser.add_argument("src", type=Path)
+    parser.add_argument("dst", type=Path)
+    parser.add_argument("--size", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.dst.suffix == ".bin":
+        if num_states(args.size) > MAX_DENSE_STATES:
+            parser.error(f"binary Q-tables are limited to boards up to 3x3, got size {args.size}")
+        save_q_table_bin(args.dst, load_q_table(args.src), size=args.size)
+    else:
+        table = load_q_table_bin(args.src)
+        save_q_table(args.dst, table.to_dict(), size=table.size)
+        table.close()
+    print(f"Saved: {args.dst}")
+
+
+if __name__ == "__main__":
+    main()
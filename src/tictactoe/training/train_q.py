@@ -1,22 +1,24 @@
 from __future__ import annotations
 
-import csv
+import argparse
 import random
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from tictactoe.core.encoding import encode_action, encode_state
 from tictactoe.core.game import GameState, new_game
-from tictactoe.core.types import Mark, Move, other
-from tictactoe.training.serialize import save_q_table
-
-
-def _state_key(state: GameState) -> str:
-    return "|".join("".join(row) for row in state.board.as_tuple())
-
-
-def _action_key(move: Move) -> str:
-    return f"{move.row},{move.col}"
+from tictactoe.core.types import Mark, Move
+from tictactoe.stats import JsonLinesSink, PhaseTimer, StatsHook
+from tictactoe.training.episode_log import EpisodeLog
+from tictactoe.training.serialize import (
+    QTable,
+    default_model_path,
+    load_checkpoint,
+    save_checkpoint,
+    save_q_table,
+)
 
 
 @dataclass
@@ -27,82 +29,198 @@ class QParams:
 
 
 class QTrainer:
-    def __init__(self, params: QParams) -> None:
+    def __init__(
+        self,
+        params: QParams,
+        seed: Optional[int] = None,
+        size: int = 3,
+        win_k: int = 3,
+        stats_hook: Optional[StatsHook] = None,
+        stats_every: int = 1000,
+    ) -> None:
         self.params = params
-        self.q: Dict[str, Dict[str, float]] = {}
-
-    def _get(self, s: str, a: str) -> float:
+        self.size = size
+        self.win_k = win_k
+        self.q: QTable = {}
+        self.rng = random.Random(seed)
+        self.stats_hook = stats_hook
+        self.stats_every = max(1, stats_every)
+        self.phases = PhaseTimer()
+
+    def _get(self, s: int, a: int) -> float:
         return self.q.get(s, {}).get(a, 0.0)
 
-    def _set(self, s: str, a: str, v: float) -> None:
+    def _set(self, s: int, a: int, v: float) -> None:
         self.q.setdefault(s, {})[a] = v
 
     def _best_next(self, state: GameState) -> float:
         moves = state.board.available_moves()
         if not moves:
             return 0.0
-        s = _state_key(state)
-        return max(self._get(s, _action_key(m)) for m in moves)
+        s, sym = encode_state(state)
+        qs = self.q.get(s, {})
+        return max(qs.get(encode_action(m, sym, self.size), 0.0) for m in moves)
 
-    def _policy(self, state: GameState) -> Move:
+    def _policy(self, state: GameState, s: int, sym: int) -> Move:
         moves = state.board.available_moves()
-        if random.random() < self.params.eps:
-            return random.choice(moves)
-        s = _state_key(state)
+        if self.rng.random() < self.params.eps:
+            return self.rng.choice(moves)
+        qs = self.q.get(s, {})
         best_m = None
         best_v = -10**9
         for m in moves:
-            v = self._get(s, _action_key(m))
+            v = qs.get(encode_action(m, sym, self.size), 0.0)
             if v > best_v:
                 best_v = v
                 best_m = m
-        return best_m if best_m is not None else random.choice(moves)
+        return best_m if best_m is not None else self.rng.choice(moves)
+
+    def play_episode(self) -> Optional[Mark]:
+        timed = self.stats_hook is not None
+        if timed:
+            t0 = time.perf_counter()
+        state = new_game(self.size, self.win_k)
+        history: List[tuple[int, int, Mark]] = []
+
+        while not state.is_terminal():
+            s, sym = encode_state(state)
+            m = self._policy(state, s, sym)
+            a = encode_action(m, sym, self.size)
+            history.append((s, a, state.to_move))
+            state = state.apply(m)
+
+        if timed:
+            t1 = time.perf_counter()
+            self.phases.add("play", t1 - t0)
+        winner = state.winner()
+        for s, a, who in history:
+            reward = 0.0
+            if winner is not None:
+                reward = 1.0 if winner == who else -1.0
+
+            old = self._get(s, a)
+            next_val = 0.0
+            new = old + self.params.alpha * (reward + self.params.gamma * next_val - old)
+            self._set(s, a, new)
+        if timed:
+            self.phases.add("update", time.perf_counter() - t1)
+        return winner
+
+    def _report(self, episode: int, results: Dict[str, int], elapsed: float, n: int) -> None:
+        self.stats_hook(
+            {
+                "trainer": type(self).__name__,
+                "episode": episode,
+                "episodes_per_sec": round(n / elapsed, 1) if elapsed > 0 else 0.0,
+                "states": len(self.q),
+                "results": dict(results),
+                "phases": self.phases.as_dict(),
+            }
+        )
+        self.phases.clear()
+        results.clear()
+
+    def save_checkpoint(self, path: Path, episode: int) -> None:
+        save_checkpoint(path, episode, self.q, self.size, self.rng.getstate())
+
+    def load_checkpoint(self, path: Path) -> int:
+        episode, self.q, rng_state = load_checkpoint(path)
+        self.rng.setstate(rng_state)
+        return episode
 
     def train_selfplay(
-        self, episodes: int, log_csv: Optional[Path] = None
-    ) -> Dict[str, Dict[str, float]]:
-        rows: List[List[str]] = []
-        for ep in range(episodes):
-            state = new_game(3, 3)
-            history: List[tuple[str, str, Mark]] = []
-
-            while not state.is_terminal():
-                s = _state_key(state)
-                m = self._policy(state)
-                a = _action_key(m)
-                history.append((s, a, state.to_move))
-                state = state.apply(m)
-
-            winner = state.winner()
-            for s, a, who in history:
-                reward = 0.0
-                if winner is not None:
-                    reward = 1.0 if winner == who else -1.0
-
-                old = self._get(s, a)
-                next_val = 0.0
-                new = old + self.params.alpha * (reward + self.params.gamma * next_val - old)
-                self._set(s, a, new)
-
-            if log_csv is not None:
-                rows.append([str(ep), winner.value if winner else "DRAW"])
-
-        if log_csv is not None:
-            log_csv.parent.mkdir(parents=True, exist_ok=True)
-            with log_csv.open("w", newline="", encoding="utf-8") as f:
-                w = csv.writer(f)
-                w.writerow(["episode", "result"])
-                w.writerows(rows)
+        self,
+        episodes: int,
+        log_csv: Optional[Path] = None,
+        checkpoint: Optional[Path] = None,
+        checkpoint_every: int = 0,
+        resume: bool = False,
+    ) -> QTable:
+        start = 0
+        if resume and checkpoint is not None and checkpoint.exists():
+            start = self.load_checkpoint(checkpoint)
+
+        results: Dict[str, int] = {}
+        window = time.perf_counter()
+        with EpisodeLog(log_csv, start) as log:
+            for ep in range(start, episodes):
+                winner = self.play_episode()
+                log.write(ep, winner)
+                done = ep + 1
+                if self.stats_hook is not None:
+                    label = winner.value if winner else "DRAW"
+                    results[label] = results.get(label, 0) + 1
+                    if done % self.stats_every == 0 or done == episodes:
+                        now = time.perf_counter()
+                        self._report(done, results, now - window, sum(results.values()))
+                        window = now
+                due = checkpoint_every > 0 and done % checkpoint_every == 0
+                if checkpoint is not None and due:
+                    log.flush()
+                    self.save_checkpoint(checkpoint, done)
 
         return self.q
 
 
 def main() -> None:
-    out = Path("data/q_table.json")
-    log = Path("data/q_learning_selfplay.csv")
-    trainer = QTrainer(QParams())
-    q = trainer.train_selfplay(episodes=30000, log_csv=log)
-    save_q_table(out, q)
+    parser = argparse.ArgumentParser(prog="tictactoe.training.train_q")
+    parser.add_argument("--episodes", type=int, default=30000)
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--k", type=int, default=0)
+    parser.add_argument("--batched", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--sync-every", type=int, default=2000)
+    parser.add_argument("--checkpoint-every", type=int, default=5000)
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--stats", default=None, metavar="PATH")
+    args = parser.parse_args()
+    if args.batched and args.workers > 1:
+        parser.error("--batched and --workers are mutually exclusive")
+    if args.resume and (args.batched or args.workers > 1):
+        parser.error("--resume is only supported by the single-process trainer")
+    if args.stats and (args.batched or args.workers > 1):
+        parser.error("--stats is only supported by the single-process trainer")
+
+    win_k = args.size if args.k == 0 else args.k
+    out = default_model_path(args.size, win_k)
+    log = out.with_name(out.stem.replace("q_table", "q_learning_selfplay") + ".csv")
+    ckpt = out.with_name(out.stem.replace("q_table", "q_checkpoint") + ".json")
+    if args.batched:
+        from tictactoe.training.batched import BatchedQTrainer
+
+        batched = BatchedQTrainer(
+            QParams(), size=args.size, win_k=win_k, batch_size=args.batch_size
+        )
+        q = batched.train_selfplay(episodes=args.episodes, log_csv=log)
+    elif args.workers > 1:
+        from tictactoe.training.parallel import ParallelQTrainer
+
+        parallel = ParallelQTrainer(
+            QParams(),
+            workers=args.workers,
+            sync_every=args.sync_every,
+            size=args.size,
+            win_k=win_k,
+        )
+        q = parallel.train_selfplay(episodes=args.episodes, log_csv=log)
+        for i, rate in enumerate(parallel.worker_rates):
+            print(f"worker {i}: {rate:.0f} episodes/s")
+    else:
+        sink = JsonLinesSink(args.stats) if args.stats else None
+        trainer = QTrainer(QParams(), size=args.size, win_k=win_k, stats_hook=sink)
+        try:
+            q = trainer.train_selfplay(
+                episodes=args.episodes,
+                log_csv=log,
+                checkpoint=ckpt,
+                checkpoint_every=args.checkpoint_every,
+                resume=args.resume,
+            )
+        finally:
+            if sink is not None:
+                sink.close()
+    save_q_table(out, q, size=args.size)
     print(f"Saved: {out}")
 
 
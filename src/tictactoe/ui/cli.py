@@ -1,15 +1,44 @@
 from __future__ import annotations
 
+import warnings
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
 from tictactoe.core.game import GameState, new_game
+from tictactoe.core.rollout import make_rollout
 from tictactoe.core.types import Mark, other
 from tictactoe.players.base import Player
+from tictactoe.players.book import BookPlayer
 from tictactoe.players.human import HumanCLI
 from tictactoe.players.mcts import MCTSBot
+from tictactoe.players.parallel_mcts import ParallelMCTSBot
 from tictactoe.players.qlearning import QLearningBot
+from tictactoe.players.solver import SolverBot
+from tictactoe.stats import StatsHook
+from tictactoe.training.book import default_book_path, load_book
+from tictactoe.training.serialize import default_model_path
+
+
+@dataclass
+class BotOptions:
+    workers: int = 1
+    iterations: Optional[int] = None
+    time_budget: Optional[float] = None
+    depth: Optional[int] = None
+    q_model: Optional[Path] = None
+    book: bool = False
+    book_path: Optional[Path] = None
+    stats_hook: Optional[StatsHook] = None
+    ponder: bool = False
+    rollout: str = "random"
+    rave: bool = False
+
+    def q_model_for(self, size: int, win_k: int) -> Path:
+        return self.q_model or default_model_path(size, win_k)
+
+    def book_for(self, size: int, win_k: int) -> Path:
+        return self.book_path or default_book_path(size, win_k)
 
 
 @dataclass
@@ -18,29 +47,96 @@ class GameSetup:
     win_k: Optional[int]
     p_x: Player
     p_o: Player
+    radius: Optional[int] = None
+
 
+def check_q_model(options: BotOptions, size: int, win_k: int) -> None:
+    path = options.q_model_for(size, win_k)
+    if not path.exists():
+        raise SystemExit(
+            f"Error: no Q model at {path}; train one with "
+            f"python -m tictactoe.training.train_q --size {size} --k {win_k}"
+        )
 
-def _make_player(kind: str, mark: Mark) -> Player:
+
+def with_book(player: Player, options: BotOptions, size: int, win_k: int) -> Player:
+    if not options.book:
+        return player
+    path = options.book_for(size, win_k)
+    if options.book_path is None and not path.exists():
+        # Books only ship for a few small boards; elsewhere the bot plays on
+        # its own rather than failing.
+        warnings.warn(f"No opening book at {path}, playing without one", stacklevel=2)
+        return player
+    return BookPlayer(player, load_book(path))
+
+
+def _make_player(
+    kind: str, mark: Mark, options: BotOptions, size: int = 3, win_k: int = 3
+) -> Player:
     if kind == "human":
         return HumanCLI(mark)
+    player = with_book(make_bot(kind, mark, options, size, win_k), options, size, win_k)
+    player.set_stats_hook(options.stats_hook)
+    return player
+
+
+def make_bot(
+    kind: str,
+    mark: Mark,
+    options: BotOptions,
+    size: int,
+    win_k: int,
+    seed: Optional[int] = None,
+) -> Player:
     if kind == "mcts":
-        return MCTSBot(mark, iterations=800)
+        if options.workers > 1:
+            return ParallelMCTSBot(
+                mark,
+                workers=options.workers,
+                iterations=options.iterations,
+                time_budget=options.time_budget,
+                seed=seed,
+                rollout=make_rollout(options.rollout),
+                rave=options.rave,
+            )
+        return MCTSBot(
+            mark,
+            iterations=options.iterations,
+            time_budget=options.time_budget,
+            seed=seed,
+            ponder=options.ponder,
+            rollout=make_rollout(options.rollout),
+            rave=options.rave,
+        )
     if kind == "q":
-        return QLearningBot(mark, model_path=Path("data/q_table.json"))
+        return QLearningBot(mark, model_path=options.q_model_for(size, win_k), seed=seed)
+    if kind == "solver":
+        return SolverBot(mark, max_depth=options.depth, time_budget=options.time_budget)
     raise ValueError("Unknown player kind")
 
 
-def make_setup(size: int, win_k: Optional[int], x_kind: str, o_kind: str) -> GameSetup:
+def make_setup(
+    size: int,
+    win_k: Optional[int],
+    x_kind: str,
+    o_kind: str,
+    options: Optional[BotOptions] = None,
+    radius: Optional[int] = None,
+) -> GameSetup:
+    options = options or BotOptions()
+    k = win_k or size
     return GameSetup(
         size=size,
         win_k=win_k,
-        p_x=_make_player(x_kind, Mark.X),
-        p_o=_make_player(o_kind, Mark.O),
+        p_x=_make_player(x_kind, Mark.X, options, size, k),
+        p_o=_make_player(o_kind, Mark.O, options, size, k),
+        radius=radius,
     )
 
 
 def play(setup: GameSetup) -> Mark | None:
-    state: GameState = new_game(setup.size, setup.win_k)
+    state: GameState = new_game(setup.size, setup.win_k, setup.radius)
     players = {Mark.X: setup.p_x, Mark.O: setup.p_o}
 
     while not state.is_terminal():
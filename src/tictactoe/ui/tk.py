@@ -1,16 +1,16 @@
 from __future__ import annotations
 
+import queue
+import threading
 import tkinter as tk
-from dataclasses import dataclass
-from pathlib import Path
-from tkinter import messagebox
-from typing import Optional
+from dataclasses import dataclass, field
+from tkinter import messagebox, ttk
+from typing import Optional, Tuple, Union
 
 from tictactoe.core.game import GameState, new_game
 from tictactoe.core.types import Mark, Move
 from tictactoe.players.base import Player
-from tictactoe.players.mcts import MCTSBot
-from tictactoe.players.qlearning import QLearningBot
+from tictactoe.ui.cli import BotOptions, make_bot, with_book
 
 
 @dataclass
@@ -18,47 +18,68 @@ class TkSetup:
     size: int = 3
     win_k: Optional[int] = None
     bot: str = "mcts"
+    options: BotOptions = field(default_factory=BotOptions)
+    radius: Optional[int] = None
 
 
 class TkApp:
     def __init__(self, root: tk.Tk, setup: TkSetup) -> None:
         self.root = root
         self.setup = setup
-        self.state: GameState = new_game(setup.size, setup.win_k)
+        self.state: GameState = new_game(setup.size, setup.win_k, setup.radius)
         self.human_mark = Mark.X
         self.bot_mark = Mark.O
-        self.bot: Player = self._make_bot(setup.bot)
+        k = self.state.config.k()
+        self.bot: Player = with_book(
+            make_bot(setup.bot, self.bot_mark, setup.options, setup.size, k),
+            setup.options,
+            setup.size,
+            k,
+        )
+        self.bot.set_stats_hook(setup.options.stats_hook)
         self.buttons: list[list[tk.Button]] = []
         self.bot_delay_ms = 100
+        self.poll_ms = 50
         self._bot_thinking = False
+        # Bot moves are computed on a worker thread and handed back through
+        # the queue, or the exception the bot raised; the generation tags
+        # results so a cancelled search from an earlier game is dropped.
+        self._worker: Optional[threading.Thread] = None
+        self._results: "queue.Queue[Tuple[int, Union[Move, Exception]]]" = queue.Queue()
+        self._generation = 0
+        self._needs_reset = False
         self._build()
 
-    def _make_bot(self, name: str) -> Player:
-        if name == "mcts":
-            return MCTSBot(self.bot_mark, iterations=600)
-        if name == "q":
-            return QLearningBot(self.bot_mark, model_path=Path("data/q_table.json"))
-        raise ValueError("Unknown bot")
-
     def _build(self) -> None:
         self.root.title("Tic-Tac-Toe AI")
         frm = tk.Frame(self.root)
         frm.pack(padx=10, pady=10)
 
-        for r in range(self.state.board.size):
+        size = self.state.board.size
+        # Large boards get compact cells so the window still fits on screen.
+        width, height = (4, 2) if size <= 5 else (2, 1)
+        for r in range(size):
             row_btns: list[tk.Button] = []
-            for c in range(self.state.board.size):
+            for c in range(size):
                 b = tk.Button(
                     frm,
                     text="",
-                    width=4,
-                    height=2,
+                    width=width,
+                    height=height,
                     command=lambda rr=r, cc=c: self.on_click(rr, cc),
                 )
                 b.grid(row=r, column=c, padx=2, pady=2)
                 row_btns.append(b)
             self.buttons.append(row_btns)
 
+        bar = tk.Frame(self.root)
+        bar.pack(fill="x", padx=10, pady=(0, 10))
+        self.status = tk.Label(bar, text="", anchor="w", width=18)
+        self.status.pack(side="left")
+        self.progress = ttk.Progressbar(bar, length=100, mode="determinate")
+        self.progress.pack(side="left", padx=4)
+        tk.Button(bar, text="New game", command=self.reset_game).pack(side="right")
+
     def on_click(self, r: int, c: int) -> None:
         if self.state.is_terminal():
             return
@@ -82,38 +103,24 @@ class TkApp:
             self._set_buttons_state("disabled")
             self.root.after(self.bot_delay_ms, self._bot_move)
 
-
-        move = Move(r, c)
-        if not self.state.board.in_bounds(move) or not self.state.board.is_empty_at(move):
-            return
-
-        self.state = self.state.apply(move)
-        self._sync_ui()
-
-        if self.state.is_terminal():
-            self._finish()
-            return
-
-        if self.state.to_move == self.bot_mark:
-            try:
-                bm = self.bot.choose_move(self.state)
-            except Exception:
-                bm = self.state.board.available_moves()[0]
-            self.state = self.state.apply(bm)
-            self._sync_ui()
-
-        if self.state.is_terminal():
-            self._finish()
-
     def _sync_ui(self) -> None:
-        for r in range(self.state.board.size):
-            for c in range(self.state.board.size):
-                v = self.state.board.grid[r][c]
+        grid = self.state.board.grid
+        for r, row in enumerate(grid):
+            for c, v in enumerate(row):
                 self.buttons[r][c]["text"] = "" if v is None else v.value
 
     def reset_game(self) -> None:
-        self.state = new_game(self.setup.size, self.setup.win_k)
+        self._generation += 1
+        if self._worker is not None and self._worker.is_alive():
+            # The bot is still searching; it is reset once the worker exits.
+            self.bot.cancel()
+            self._needs_reset = True
+        else:
+            self.bot.reset()
+        self.state = new_game(self.setup.size, self.setup.win_k, self.setup.radius)
         self._bot_thinking = False
+        self._show_progress(None)
+        self._set_buttons_state("normal")
         self._sync_ui()
 
     def _finish(self) -> None:
@@ -130,35 +137,95 @@ class TkApp:
                 b["state"] = state
 
     def _bot_move(self) -> None:
-        if self.state.is_terminal():
+        if self.state.is_terminal() or self.state.to_move != self.bot_mark:
             self._bot_thinking = False
             self._set_buttons_state("normal")
             return
-
-        if self.state.to_move != self.bot_mark:
-            self._bot_thinking = False
-            self._set_buttons_state("normal")
+        if self._worker is not None and self._worker.is_alive():
+            self.root.after(self.poll_ms, self._bot_move)
             return
-
+        if self._needs_reset:
+            self.bot.reset()
+            self._needs_reset = False
+
+        self.bot.reset_cancel()
+        self._worker = threading.Thread(
+            target=self._search, args=(self._generation, self.state), daemon=True
+        )
+        self._worker.start()
+        self._show_progress(self.bot.search_progress())
+        self.root.after(self.poll_ms, self._poll)
+
+    def _search(self, generation: int, state: GameState) -> None:
+        # Worker thread: never touches Tk.
         try:
-            bm = self.bot.choose_move(self.state)
-        except Exception:
-            moves = self.state.board.available_moves()
-            bm = moves[0]
+            result: Union[Move, Exception] = self.bot.choose_move(state)
+        except Exception as e:
+            result = e
+        self._results.put((generation, result))
 
-        self.state = self.state.apply(bm)
-        self._sync_ui()
+    def _poll(self) -> None:
+        while True:
+            try:
+                generation, result = self._results.get_nowait()
+            except queue.Empty:
+                if self._bot_thinking:
+                    self._show_progress(self.bot.search_progress())
+                    self.root.after(self.poll_ms, self._poll)
+                return
+            if generation == self._generation:
+                break
 
         self._bot_thinking = False
+        self._show_progress(None)
+        if isinstance(result, Exception):
+            self._bot_failed(result)
+            return
+        try:
+            self.state = self.state.apply(result)
+        except ValueError as e:
+            self._bot_failed(ValueError(f"Illegal move {result}: {e}"))
+            return
+        self._sync_ui()
         self._set_buttons_state("normal")
 
         if self.state.is_terminal():
             self._finish()
 
+    def _bot_failed(self, error: Exception) -> None:
+        messagebox.showerror("Bot error", f"{type(error).__name__}: {error}")
+        self.reset_game()
 
-
-def run_tk(size: int = 3, win_k: Optional[int] = None, bot: str = "mcts") -> None:
+    def _show_progress(self, progress: Optional[Tuple[int, int]]) -> None:
+        if progress is None:
+            self.status["text"] = ""
+            self.progress.stop()
+            self.progress.configure(mode="determinate", value=0)
+            return
+        done, total = progress
+        if total > 0:
+            self.status["text"] = f"Thinking: {done}/{total}"
+            self.progress.configure(mode="determinate", maximum=total, value=done)
+        else:
+            self.status["text"] = f"Thinking: {done}"
+            if str(self.progress["mode"]) != "indeterminate":
+                self.progress.configure(mode="indeterminate")
+                self.progress.start(self.poll_ms)
+
+
+def run_tk(
+    size: int = 3,
+    win_k: Optional[int] = None,
+    bot: str = "mcts",
+    options: Optional[BotOptions] = None,
+    radius: Optional[int] = None,
+) -> None:
     root = tk.Tk()
-    app = TkApp(root, TkSetup(size=size, win_k=win_k, bot=bot))
+    setup = TkSetup(size=size, win_k=win_k, bot=bot, options=options or BotOptions(), radius=radius)
+    app = TkApp(root, setup)
     app._sync_ui()
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        app.bot.cancel()
+        app.bot.close()
@@ -0,0 +1,27 @@
+import pytest
+
+from tictactoe.arena import MatchSpec, elo_from_score, percentile, run_arena
+from tictactoe.ui.cli import BotOptions
+
+
+def test_arena_is_deterministic_across_workers():
+    spec = MatchSpec("mcts", "q", a_options=BotOptions(iterations=30), seed=7)
+    serial = run_arena(spec, 8, workers=1)
+    pooled = run_arena(spec, 8, workers=2)
+    assert [r.score for r in serial.results] == [r.score for r in pooled.results]
+    assert [r.a_is_x for r in serial.results] == [True, False] * 4
+    assert serial.count(1.0) + serial.count(0.5) + serial.count(0.0) == 8
+    assert all(len(r.a_times) >= 2 for r in serial.results)
+
+
+def test_solver_is_never_worse_than_mcts():
+    spec = MatchSpec("solver", "mcts", b_options=BotOptions(iterations=50))
+    report = run_arena(spec, 6)
+    assert report.count(0.0) == 0
+    assert report.elo()[0] >= 0
+
+
+def test_elo_and_percentile():
+    assert elo_from_score(0.5) == 0
+    assert elo_from_score(0.75) == pytest.approx(190.8, abs=0.1)
+    assert percentile([float(i) for i in range(1, 101)], 0.95) == 95.0
@@ -0,0 +1,26 @@
+from tictactoe.bench import Result, load_baseline, main, regressions, run, save_baseline
+
+
+def test_regressions_respect_direction_and_threshold():
+    baseline = {
+        "rate": Result("rate", 100.0, "ops/s"),
+        "latency": Result("latency", 10.0, "ms", higher_is_better=False),
+    }
+    ok = [Result("rate", 80.0, "ops/s"), Result("latency", 12.0, "ms", False)]
+    assert regressions(ok, baseline, 0.25) == []
+    bad = [Result("rate", 70.0, "ops/s"), Result("latency", 13.0, "ms", False)]
+    assert [line.split(":")[0] for line in regressions(bad, baseline, 0.25)] == [
+        "rate",
+        "latency",
+    ]
+
+
+def test_baseline_round_trip_and_exit_code(tmp_path):
+    path = tmp_path / "baseline.json"
+    results = run(["rollouts3"])
+    assert results[0].name == "rollouts_3x3" and results[0].value > 0
+    save_baseline(path, results)
+    assert load_baseline(path)["rollouts_3x3"].value == results[0].value
+
+    save_baseline(path, [Result("rollouts_3x3", 1e12, "ops/s")])
+    assert main(["rollouts3", "--baseline", str(path)]) == 1
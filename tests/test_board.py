@@ -17,3 +17,21 @@ def test_illegal_move():
     b.place(Move(0, 0), Mark.X)
     with pytest.raises(ValueError):
         b.place(Move(0, 0), Mark.O)
+
+
+def test_winner_lines_4x4_k3():
+    b = Board.empty(4)
+    for m in (Move(1, 3), Move(2, 2), Move(3, 1)):
+        b.place(m, Mark.O)
+    assert b.winner(3) == Mark.O
+    assert b.winner(4) is None
+
+
+def test_copy_is_independent():
+    b = Board.empty(3)
+    b.place(Move(1, 1), Mark.X)
+    c = b.copy()
+    c.place(Move(0, 0), Mark.O)
+    assert b.is_empty_at(Move(0, 0))
+    assert c.as_tuple() == ((("O", ".", ".")), (".", "X", "."), (".", ".", "."))
+    assert Board.from_grid(c.grid) == c
@@ -1,11 +1,21 @@
+import random
+import threading
+import time
 from pathlib import Path
 
 import pytest
 
 from tictactoe.core.game import new_game
-from tictactoe.core.types import Mark
-from tictactoe.players.mcts import MCTSBot
+from tictactoe.core.rollout import TacticalRollout
+from tictactoe.core.types import Mark, Move
+from tictactoe.players.book import BookPlayer
+from tictactoe.players.compact_mcts import CompactMCTSBot
+from tictactoe.players.mcts import MCTSBot, Node
+from tictactoe.players.parallel_mcts import ParallelMCTSBot
 from tictactoe.players.qlearning import QLearningBot
+from tictactoe.players.solver import SolverBot, default_depth
+from tictactoe.training.book import build_book, load_book, save_book
+from tictactoe.ui.cli import BotOptions, with_book
 
 
 def test_mcts_chooses_legal_move():
@@ -16,10 +26,320 @@ def test_mcts_chooses_legal_move():
     assert s.board.is_empty_at(m)
 
 
-def test_qlearning_requires_3x3(tmp_path: Path):
+def test_qlearning_plays_larger_boards(tmp_path: Path):
     model = tmp_path / "q.json"
-    model.write_text("{}", encoding="utf-8")
-    bot = QLearningBot(Mark.X, model_path=model)
-    s = new_game(4, 4)
-    with pytest.raises(ValueError):
+    model.write_text('{"X...|....|....|....": {"1,1": 1.0}}', encoding="utf-8")
+    bot = QLearningBot(Mark.O, model_path=model, eps=0.0)
+    s = new_game(4, 4).apply(Move(3, 3))
+    assert bot.choose_move(s) == Move(2, 2)
+
+
+def test_mcts_reuses_subtree_after_opponent_reply():
+    s = new_game(3, 3)
+    bot = MCTSBot(Mark.X, iterations=50, seed=0)
+    m = bot.choose_move(s)
+    s = s.apply(m)
+    reply = s.board.available_moves()[0]
+    s = s.apply(reply)
+    root = bot._root_for(s)
+    assert root.parent is None
+    assert root.state.board == s.board
+    assert root.visits > 0
+
+    bot.reset()
+    assert bot._root_for(s).visits == 0
+
+
+def test_mcts_transposition_table_is_bounded():
+    s = new_game(4, 3)
+    bot = MCTSBot(Mark.X, iterations=50, seed=0, transpositions=True, table_size=300)
+    m = bot.choose_move(s)
+    assert s.board.is_empty_at(m)
+    assert 0 < len(bot._table) <= 300
+    assert bot._root_for(s).visits > 0
+
+
+def test_parallel_mcts_merges_worker_visits():
+    s = new_game(3, 3).apply(Move(0, 0)).apply(Move(1, 1))
+    with ParallelMCTSBot(Mark.X, workers=2, seed=3) as bot:
+        visits = bot.search_visits(s)
+        m = bot.choose_move(s)
+    assert sum(visits.values()) > 0
+    assert set(visits) <= set(s.board.available_moves())
+    assert s.board.is_empty_at(m)
+
+
+def test_mcts_honors_iterations():
+    bot = MCTSBot(Mark.X, iterations=37, seed=0, reuse_tree=False)
+    bot.choose_move(new_game(4, 3))
+    assert bot.last_iterations == 37
+
+
+def test_mcts_time_budget_stops_at_deadline():
+    bot = MCTSBot(Mark.X, time_budget=0.05, seed=0)
+    start = time.perf_counter()
+    m = bot.choose_move(new_game(6, 4))
+    assert time.perf_counter() - start < 1.0
+    assert bot.last_iterations > 0
+    assert new_game(6, 4).board.is_empty_at(m)
+
+
+def test_mcts_game_clock_is_spent_across_moves():
+    bot = MCTSBot(Mark.X, game_time=0.2, seed=0)
+    s = new_game(3, 3)
+    bot.choose_move(s)
+    assert 0.0 <= bot._clock_left < 0.2
+
+
+def _x_to_win():
+    s = new_game(3, 3)
+    for m in (Move(0, 0), Move(1, 0), Move(0, 1), Move(1, 1)):
+        s = s.apply(m)
+    return s
+
+
+def test_mcts_takes_immediate_win():
+    s = _x_to_win()
+    assert MCTSBot(Mark.X, iterations=400, seed=0).choose_move(s) == Move(0, 2)
+
+
+def test_mcts_blocks_opponent_win():
+    s = new_game(3, 3)
+    for m in (Move(1, 0), Move(0, 0), Move(1, 1)):
+        s = s.apply(m)
+    assert MCTSBot(Mark.O, iterations=600, seed=0).choose_move(s) == Move(1, 2)
+
+
+def test_compact_mcts_matches_tree_search():
+    s = _x_to_win()
+    bot = CompactMCTSBot(Mark.X, iterations=400, seed=0)
+    assert bot.choose_move(s) == Move(0, 2)
+    tree = bot.search(new_game(4, 3), iterations=200)
+    assert tree.visits[0] == 200
+    assert sum(tree.visits[ch] for ch in tree.children(0)) == 200
+    assert tree.nbytes() < 32 * len(tree)
+
+
+def test_solver_takes_win_and_blocks():
+    s = new_game(3, 3)
+    for m in [Move(0, 0), Move(1, 0), Move(0, 1)]:
+        s = s.apply(m)
+    assert SolverBot(Mark.O).choose_move(s) == Move(0, 2)
+    s = s.apply(Move(2, 2))
+    assert SolverBot(Mark.X).choose_move(s) == Move(0, 2)
+
+
+def test_solver_self_play_draws_on_3x3_and_4x4():
+    for size in (3, 4):
+        s = new_game(size, size)
+        bots = {Mark.X: SolverBot(Mark.X), Mark.O: SolverBot(Mark.O)}
+        while not s.is_terminal():
+            s = s.apply(bots[s.to_move].choose_move(s))
+        assert s.winner() is None
+
+
+def test_solver_opens_in_the_centre():
+    for size, k in ((3, 3), (4, 4), (5, 4)):
+        m = SolverBot(Mark.X).choose_move(new_game(size, k))
+        assert {m.row, m.col} <= {(size - 1) // 2, size // 2}
+
+
+def test_solver_never_loses_to_random_play():
+    rng = random.Random(3)
+    for game in range(20):
+        s = new_game(3, 3)
+        solver = SolverBot(Mark.O if game % 2 else Mark.X)
+        while not s.is_terminal():
+            if s.to_move == solver.mark:
+                m = solver.choose_move(s)
+            else:
+                m = rng.choice(s.board.available_moves())
+            s = s.apply(m)
+        assert s.winner() in (None, solver.mark)
+
+
+def test_solver_respects_time_budget_on_5x5():
+    bot = SolverBot(Mark.X, time_budget=0.2)
+    s = new_game(5, 4)
+    start = time.perf_counter()
+    m = bot.choose_move(s)
+    assert time.perf_counter() - start < 1.0
+    assert s.board.is_empty_at(m)
+    assert bot.last_depth >= 1
+
+
+def test_book_player_answers_from_book_and_falls_back(tmp_path: Path):
+    book = build_book(3, 3, depth=2)
+    path = tmp_path / "book.bin"
+    save_book(path, book)
+    loaded = load_book(path)
+    assert loaded.moves == book.moves
+
+    player = BookPlayer(MCTSBot(Mark.O, iterations=20, seed=0), loaded)
+    corner = new_game(3, 3).apply(Move(2, 0))
+    assert player.choose_move(corner) == Move(1, 1)
+    assert player.hits == 1
+
+    s = corner.apply(Move(1, 1)).apply(Move(0, 2))
+    m = player.choose_move(s)
+    assert player.hits == 1
+    assert s.board.is_empty_at(m)
+
+
+def test_missing_default_book_falls_back_to_the_bot(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bot = SolverBot(Mark.X)
+    with pytest.warns(UserWarning, match="No opening book"):
+        assert with_book(bot, BotOptions(book=True), 6, 5) is bot
+    with pytest.raises(FileNotFoundError):
+        with_book(bot, BotOptions(book=True, book_path=tmp_path / "none.bin"), 3, 3)
+
+
+def test_stats_hook_reports_search_phases():
+    records = []
+    s = new_game(3, 3)
+    for cls in (MCTSBot, CompactMCTSBot):
+        bot = cls(Mark.X, iterations=200, seed=0)
+        bot.set_stats_hook(records.append)
         bot.choose_move(s)
+    solver = SolverBot(Mark.X)
+    solver.set_stats_hook(records.append)
+    solver.choose_move(s)
+
+    mcts, compact, exact = records
+    for r in (mcts, compact):
+        assert r["iterations"] == 200
+        assert sum(r["root_visits"].values()) == 200
+        assert r["tree_size"] > 9 and r["max_depth"] >= 1
+        assert set(r["phases"]) >= {"select", "rollout", "backprop"}
+    assert mcts["player"] == "MCTSBot" and compact["player"] == "CompactMCTSBot"
+    assert exact["nodes"] > 0 and exact["score"] == 0
+
+
+def test_shipped_books_match_the_solver_on_the_empty_board():
+    books = sorted((Path(__file__).parents[1] / "data").glob("book_*.bin"))
+    assert books
+    for path in books:
+        book = load_book(path)
+        s = new_game(book.size, book.win_k)
+        solver = SolverBot(Mark.X, max_depth=default_depth(book.size))
+        assert book.lookup(s) == solver.choose_move(s), path.name
+
+
+def test_book_player_forwards_stats_hook():
+    records = []
+    player = BookPlayer(SolverBot(Mark.X), build_book(3, 3, depth=0))
+    player.set_stats_hook(records.append)
+    s = new_game(3, 3)
+    player.choose_move(s)
+    player.choose_move(s.apply(Move(1, 1)).apply(Move(0, 0)))
+    assert records[0]["book_hit"] is True
+    assert records[1]["player"] == "SolverBot"
+
+
+def test_search_can_be_cancelled_from_another_thread():
+    s = new_game(5, 4)
+    bots = (
+        MCTSBot(Mark.X, iterations=10**7, seed=0),
+        SolverBot(Mark.X, max_depth=25),
+        ParallelMCTSBot(Mark.X, workers=2, iterations=10**7, seed=0),
+    )
+    for bot in bots:
+        result = []
+        worker = threading.Thread(target=lambda b=bot: result.append(b.choose_move(s)))
+        worker.start()
+        deadline = time.perf_counter() + 5.0
+        while bot.search_progress()[0] == 0 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        bot.cancel()
+        worker.join(timeout=5.0)
+        assert not worker.is_alive()
+        assert s.board.is_empty_at(result[0])
+        bot.reset_cancel()
+        assert bot.search_progress()[0] == 0
+        bot.close()
+
+
+def test_mcts_ponders_on_opponent_time():
+    records = []
+    bot = MCTSBot(Mark.X, iterations=200, seed=0, ponder=True, ponder_iterations=500)
+    bot.set_stats_hook(records.append)
+    s = new_game(3, 3)
+    s = s.apply(bot.choose_move(s))
+    deadline = time.perf_counter() + 5.0
+    while bot.pondering and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    reply = s.board.available_moves()[0]
+    bot.choose_move(s.apply(reply))
+    assert records[1]["pondered"] == 500
+    assert sum(records[1]["root_visits"].values()) > 200
+    assert bot.pondering
+    bot.reset()
+    assert not bot.pondering
+    bot.close()
+
+
+def test_mcts_accepts_rollout_policy():
+    # O must block at (0, 2); the tactical rollouts see it with few iterations.
+    s = new_game(3, 3).apply(Move(0, 0)).apply(Move(2, 2)).apply(Move(0, 1))
+    for cls in (MCTSBot, CompactMCTSBot):
+        bot = cls(Mark.O, iterations=100, seed=0, rollout=TacticalRollout())
+        assert bot.choose_move(s) == Move(0, 2)
+
+
+def test_rave_keeps_amaf_statistics():
+    s = new_game(3, 3).apply(Move(0, 0)).apply(Move(2, 2)).apply(Move(0, 1))
+    bot = MCTSBot(Mark.O, iterations=300, seed=0, rave=True)
+    assert bot.choose_move(s) == Move(0, 2)
+    root = bot.search(s, iterations=100)
+    assert root.amaf_visits is not None
+    # Occupied cells never get AMAF updates; every free cell does.
+    for i in range(9):
+        occupied = s.board.x_bits >> i & 1 or s.board.o_bits >> i & 1
+        assert (root.amaf_visits[i] == 0) == bool(occupied)
+    assert root.amaf_visits[2] >= root.children[Move(0, 2)].visits
+
+
+def test_rave_scores_the_edge_move_of_shared_nodes():
+    # With transpositions a child is shared between parents and keeps the move
+    # it was first reached by; AMAF must be read for the edge being scored.
+    s = new_game(3, 3).apply(Move(1, 1)).apply(Move(2, 2))
+    other = new_game(3, 3).apply(Move(0, 1)).apply(Move(2, 2))
+    shared = s.apply(Move(0, 1))
+    assert shared == other.apply(Move(1, 1))
+    parent = Node(state=s, parent=None, move=None, visits=10)
+    child = Node(state=shared, parent=None, move=Move(1, 1), visits=1)
+    parent.amaf_visits = [0] * 9
+    parent.amaf_sum = [0.0] * 9
+    parent.amaf_visits[1] = 10
+    parent.amaf_sum[1] = 10.0
+    assert parent.rave_score(Move(0, 1), child, 0.0, 1.0, 500) > 0.9
+
+    bot = MCTSBot(Mark.X, iterations=300, seed=0, transpositions=True, rave=True)
+    assert s.board.is_empty_at(bot.choose_move(s))
+
+
+def test_compact_mcts_rejects_options_it_does_not_implement():
+    for option in ("rave", "ponder", "reuse_tree", "transpositions"):
+        with pytest.raises(TypeError):
+            CompactMCTSBot(Mark.X, **{option: True})
+
+
+def test_large_board_search_stays_near_stones():
+    # X has an open four on 15x15; O must block one end and X wins at the other.
+    s = new_game(15, 5, radius=2)
+    for col, row in ((5, 0), (6, 1), (7, 2), (8, None)):
+        s = s.apply(Move(7, col))
+        if row is not None:
+            s = s.apply(Move(row, 14))
+    solver = SolverBot(Mark.O, max_depth=2)
+    assert solver.choose_move(s) in (Move(7, 4), Move(7, 9))
+    for cls in (MCTSBot, CompactMCTSBot):
+        assert cls(Mark.O, iterations=300, seed=0).choose_move(s) in s.candidate_moves()
+    root = MCTSBot(Mark.O, seed=0).search(s, iterations=50)
+    assert set(root.children) <= set(s.candidate_moves())
+    tree = CompactMCTSBot(Mark.O, seed=0).search(s, iterations=50)
+    cells = {s.board.index(m) for m in s.candidate_moves()}
+    assert {tree.cell[ch] for ch in tree.children(0)} == cells
+    after = s.apply(Move(7, 4))
+    assert SolverBot(Mark.X, max_depth=2).choose_move(after) == Move(7, 9)
@@ -1,5 +1,8 @@
-from tictactoe.core.game import new_game
+import random
+
+from tictactoe.core.game import GameState, new_game
 from tictactoe.core.types import Move
+from tictactoe.core.zobrist import board_key
 
 
 def test_win_row_3x3():
@@ -11,3 +14,56 @@ def test_win_row_3x3():
     s = s.apply(Move(0, 2))
     assert s.winner() is not None
     assert s.is_terminal()
+
+
+def test_incremental_outcome_matches_full_scan():
+    rng = random.Random(0)
+    for size, k in ((3, 3), (4, 3), (5, 4)):
+        for _ in range(50):
+            s = new_game(size, k)
+            while not s.is_terminal():
+                s = s.apply(rng.choice(s.board.available_moves()))
+                assert s.winner() == s.board.winner(k)
+                assert s.is_full() == s.board.is_full()
+            fresh = GameState(board=s.board.copy(), to_move=s.to_move, config=s.config)
+            assert fresh.moves_played == s.moves_played
+            assert fresh.winner() == s.winner()
+            assert fresh.is_terminal()
+
+
+def test_zobrist_key_is_incremental_and_order_independent():
+    a = new_game(4, 3).apply(Move(0, 0)).apply(Move(1, 1)).apply(Move(2, 2))
+    b = new_game(4, 3).apply(Move(2, 2)).apply(Move(1, 1)).apply(Move(0, 0))
+    assert a.key == b.key
+    assert a.key == board_key(a.board)
+    assert a.key != new_game(4, 3).apply(Move(0, 0)).key
+
+
+def test_large_board_candidates_stay_near_stones():
+    rng = random.Random(0)
+    s = new_game(15, 5, radius=2)
+    assert s.candidate_moves() == [Move(7, 7)]
+    for _ in range(30):
+        s = s.apply(rng.choice(s.candidate_moves()))
+        fresh = GameState(board=s.board.copy(), to_move=s.to_move, config=s.config)
+        assert fresh.near == s.near
+        free = s.board.available_moves()
+        stones = [Move(r, c) for r in range(15) for c in range(15) if Move(r, c) not in free]
+        expected = {
+            m
+            for m in free
+            if any(abs(m.row - t.row) <= 2 and abs(m.col - t.col) <= 2 for t in stones)
+        }
+        assert set(s.candidate_moves()) == expected
+        assert s.winner() == s.board.winner(5)
+    # Without a radius every empty cell is a candidate.
+    dense = new_game(15, 5).apply(Move(0, 0))
+    assert len(dense.candidate_moves()) == 224
+
+
+def test_states_compare_by_position():
+    a = new_game(3, 3).apply(Move(0, 0)).apply(Move(1, 1)).apply(Move(2, 2))
+    b = new_game(3, 3).apply(Move(2, 2)).apply(Move(1, 1)).apply(Move(0, 0))
+    assert a == b
+    assert a == GameState(board=a.board.copy(), to_move=a.to_move, config=a.config)
+    assert a != a.apply(Move(0, 1))
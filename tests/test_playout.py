@@ -0,0 +1,90 @@
+import random
+
+from tictactoe.core.game import new_game
+from tictactoe.core.playout import Playout
+from tictactoe.core.rollout import TacticalRollout
+from tictactoe.core.types import Mark, Move
+
+
+def test_play_and_undo_restore_position():
+    s = new_game(4, 3)
+    for m in s.board.available_moves()[:3]:
+        s = s.apply(m)
+    pl = Playout(4, 3)
+    pl.load(s)
+    before = (pl.x_bits, pl.o_bits, pl.to_move, sorted(pl.empty))
+    rng = random.Random(1)
+    for _ in range(5):
+        pl.play_at(rng.randrange(len(pl.empty)))
+        if pl.is_terminal():
+            break
+    while pl.depth():
+        pl.undo()
+    assert (pl.x_bits, pl.o_bits, pl.to_move, sorted(pl.empty)) == before
+    assert pl.winner is None
+
+
+def test_play_detects_win_like_game_state():
+    s = new_game(3, 3)
+    pl = Playout(3, 3)
+    pl.load(s)
+    for cell in (0, 3, 1, 4, 2):
+        pl.play(cell)
+    assert pl.winner == Mark.X
+
+
+def test_rollout_leaves_position_unchanged():
+    s = new_game(5, 4)
+    pl = Playout(5, 4)
+    pl.load(s)
+    rng = random.Random(7)
+    results = {pl.rollout(rng) for _ in range(200)}
+    assert results <= {Mark.X, Mark.O, None}
+    assert pl.depth() == 0
+    assert len(pl.empty) == 25
+    assert pl.x_bits == pl.o_bits == 0
+
+
+def test_candidate_cells_follow_game_state_near_stones():
+    s = new_game(15, 5, radius=2)
+    pl = Playout(15, 5)
+    pl.load(s)
+    assert pl.candidate_cells() == [7 * 15 + 7]
+    for m in (Move(7, 7), Move(0, 0), Move(7, 8)):
+        pl.play(s.board.index(m))
+        s = s.apply(m)
+        assert pl.candidate_cells() == [s.board.index(c) for c in s.candidate_moves()]
+    before = pl.candidate_cells()
+    pl.play(s.board.index(Move(14, 14)))
+    pl.undo()
+    assert pl.candidate_cells() == before
+    pl.load(s)
+    assert pl.candidate_cells() == before
+
+
+class RecordingPlayout(Playout):
+    def __init__(self, size: int, win_k: int) -> None:
+        super().__init__(size, win_k)
+        self.cells = []
+
+    def play_at(self, pos: int) -> None:
+        self.cells.append(self.empty[pos])
+        super().play_at(pos)
+
+
+def test_tactical_rollout_wins_then_blocks():
+    policy = TacticalRollout()
+    rng = random.Random(0)
+    # X threatens (0, 2) and O has no threat: O must block first.
+    s = new_game(3, 3).apply(Move(0, 0)).apply(Move(2, 2)).apply(Move(0, 1))
+    pl = RecordingPlayout(3, 3)
+    pl.load(s)
+    for _ in range(30):
+        pl.cells.clear()
+        policy.rollout(pl, rng)
+        assert pl.cells[0] == 2
+    # X now threatens (0, 2) and (2, 0): O can only block one of them.
+    s = s.apply(Move(1, 1)).apply(Move(1, 0))
+    pl.load(s)
+    assert {policy.rollout(pl, rng) for _ in range(30)} == {Mark.X}
+    assert pl.depth() == 0 and pl.x_bits == s.board.x_bits and len(pl.empty) == 4
@@ -0,0 +1,43 @@
+import random
+
+from tictactoe.core.board import Board
+from tictactoe.core.game import new_game
+from tictactoe.core.symmetry import (
+    canonical,
+    from_canonical,
+    permutations,
+    to_canonical,
+    transform_board,
+)
+
+
+def test_eight_distinct_symmetries():
+    for size in (3, 4, 5):
+        perms = permutations(size)
+        assert len(set(perms)) == 8
+        assert all(sorted(p) == list(range(size * size)) for p in perms)
+
+
+def test_canonical_form_is_shared_by_all_symmetric_boards():
+    rng = random.Random(0)
+    for size in (3, 4):
+        s = new_game(size, 3)
+        for _ in range(5):
+            s = s.apply(rng.choice(s.board.available_moves()))
+        canon, _ = canonical(s.board)
+        for sym in range(8):
+            assert canonical(transform_board(s.board, sym))[0] == canon
+
+
+def test_moves_map_to_canonical_frame_and_back():
+    s = new_game(3, 3)
+    board = Board.from_grid(s.board.grid)
+    for m in board.available_moves():
+        b = board.copy()
+        b.place(m, s.to_move)
+        canon, sym = canonical(board)
+        cm = to_canonical(m, sym, 3)
+        assert from_canonical(cm, sym, 3) == m
+        expected = canon.copy()
+        expected.place(cm, s.to_move)
+        assert transform_board(b, sym) == expected
@@ -0,0 +1,160 @@
+import os
+
+import pytest
+
+from tictactoe.core.encoding import board_from_id, encode_action, encode_state
+from tictactoe.core.game import new_game
+from tictactoe.core.symmetry import canonical
+from tictactoe.core.types import Mark, Move
+from tictactoe.players.qlearning import QLearningBot
+from tictactoe.training.parallel import ParallelQTrainer, merge_q_deltas, merge_q_tables
+from tictactoe.training.serialize import (
+    clear_model_cache,
+    load_q_table_bin,
+    save_q_table,
+    save_q_table_bin,
+)
+from tictactoe.training.train_q import QParams, QTrainer
+
+
+def _is_canonical(sid: int, size: int = 3) -> bool:
+    board = board_from_id(sid, size)
+    return canonical(board)[0] == board
+
+
+def test_symmetric_states_share_encoding():
+    a = new_game(3, 3).apply(Move(0, 0)).apply(Move(1, 2))
+    b = new_game(3, 3).apply(Move(2, 2)).apply(Move(1, 0))
+    sid_a, sym_a = encode_state(a)
+    sid_b, sym_b = encode_state(b)
+    assert sid_a == sid_b
+    assert encode_action(Move(0, 1), sym_a, 3) == encode_action(Move(2, 1), sym_b, 3)
+
+
+def test_batched_trainer_produces_canonical_table():
+    pytest.importorskip("numpy")
+    from tictactoe.training.batched import BatchedQTrainer
+
+    trainer = BatchedQTrainer(QParams(), batch_size=256, seed=0)
+    q = trainer.train_selfplay(2000)
+    assert 0 in q
+    assert all(_is_canonical(k) for k in q)
+    assert all(-1.0 <= v <= 1.0 for qs in q.values() for v in qs.values())
+    assert 1 in q
+    assert 3**2 not in q
+
+
+def test_merge_q_tables_averages_against_base():
+    base = {0: {4: 0.4}}
+    merged = merge_q_tables(base, [{0: {4: 1.0}}, {0: {4: 0.4, 0: -1.0}}])
+    assert merged[0][4] == pytest.approx(0.7)
+    assert merged[0][0] == pytest.approx(-0.5)
+
+
+def test_merge_q_deltas_matches_full_merge():
+    base = {0: {4: 0.4, 1: 0.2}, 5: {0: 0.1}}
+    full = [{0: {4: 1.0, 1: 0.2}, 5: {0: 0.1}}, {0: {4: 0.4, 1: 0.2, 0: -1.0}, 5: {0: 0.1}}]
+    deltas = [{0: {4: 1.0}}, {0: {0: -1.0}}]
+    merged = merge_q_deltas(base, deltas)
+    assert set(merged) == {0} and set(merged[0]) == {0, 4}
+    assert merged[0] == {a: v for a, v in merge_q_tables(base, full)[0].items() if a != 1}
+
+
+def test_parallel_trainer_runs_shards(tmp_path):
+    trainer = ParallelQTrainer(QParams(), workers=2, sync_every=50, seed=1)
+    log = tmp_path / "log.csv"
+    q = trainer.train_selfplay(150, log_csv=log)
+    assert 0 in q
+    assert len(log.read_text(encoding="utf-8").splitlines()) == 151
+    assert all(rate > 0 for rate in trainer.worker_rates)
+
+
+def test_binary_q_table_round_trip(tmp_path):
+    q = {0: {4: 0.5, 0: -0.25}, 1: {4: 0.125}}
+    path = tmp_path / "q.bin"
+    save_q_table_bin(path, q)
+    table = load_q_table_bin(path)
+    assert table.get(0, 4) == 0.5
+    assert table.get(0, 1) == 0.0
+    assert table.to_dict() == q
+    table.close()
+
+
+def test_binary_q_table_rejects_large_boards(tmp_path):
+    path = tmp_path / "q.bin"
+    with pytest.raises(ValueError, match="up to 3x3"):
+        save_q_table_bin(path, {}, size=4)
+    assert not path.exists()
+
+
+def test_qlearning_bot_reads_binary_table(tmp_path):
+    q = {0: {8: 1.0}}
+    path = tmp_path / "q.bin"
+    save_q_table_bin(path, q)
+    bot = QLearningBot(Mark.X, model_path=path, eps=0.0)
+    assert bot.choose_move(new_game(3, 3)) == Move(2, 2)
+
+
+def test_qlearning_bot_rejects_missing_model(tmp_path):
+    with pytest.raises(FileNotFoundError, match="No Q model"):
+        QLearningBot(Mark.X, model_path=tmp_path / "missing.json")
+
+
+def test_qlearning_bot_rejects_table_for_another_size(tmp_path):
+    path = tmp_path / "q.json"
+    save_q_table(path, {0: {4: 1.0}}, size=3)
+    bot = QLearningBot(Mark.X, model_path=path, eps=0.0)
+    assert bot.q.size == 3
+    with pytest.raises(ValueError, match="3x3"):
+        bot.choose_move(new_game(4, 4))
+    clear_model_cache()
+
+
+def test_q_model_cache_shares_and_reloads(tmp_path):
+    path = tmp_path / "q.json"
+    save_q_table(path, {0: {0: 1.0}})
+    a = QLearningBot(Mark.X, model_path=path)
+    b = QLearningBot(Mark.O, model_path=path)
+    assert a.q is b.q
+
+    save_q_table(path, {0: {4: 1.0, 0: 0.0}})
+    os.utime(path, ns=(0, 10**9))
+    c = QLearningBot(Mark.X, model_path=path)
+    assert c.q is not a.q
+    assert c.q[0][4] == 1.0
+    clear_model_cache()
+
+
+def test_trainer_handles_4x4():
+    trainer = QTrainer(QParams(), seed=0, size=4, win_k=3)
+    q = trainer.train_selfplay(50)
+    assert 0 in q
+    assert all(_is_canonical(k, 4) for k in q)
+
+
+def test_resume_from_checkpoint_matches_uninterrupted_run(tmp_path):
+    full = QTrainer(QParams(), seed=5)
+    expected = full.train_selfplay(300)
+
+    ckpt = tmp_path / "ckpt.json"
+    log = tmp_path / "log.csv"
+    crashed = QTrainer(QParams(), seed=5)
+    crashed.train_selfplay(250, log_csv=log, checkpoint=ckpt, checkpoint_every=100)
+
+    resumed = QTrainer(QParams())
+    q = resumed.train_selfplay(300, log_csv=log, checkpoint=ckpt, checkpoint_every=100, resume=True)
+    assert q == expected
+    lines = log.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 301
+    assert [line.split(",")[0] for line in lines[1:]] == [str(i) for i in range(300)]
+
+
+def test_trainer_stats_hook_reports_every_window():
+    records = []
+    trainer = QTrainer(QParams(), seed=0, stats_hook=records.append, stats_every=100)
+    trainer.train_selfplay(250)
+    assert [r["episode"] for r in records] == [100, 200, 250]
+    assert sum(records[0]["results"].values()) == 100
+    assert sum(records[2]["results"].values()) == 50
+    assert records[-1]["states"] == len(trainer.q)
+    assert set(records[0]["phases"]) == {"play", "update"}